@@ -0,0 +1,307 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+from datetime import datetime
+from queue import Empty
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from fixture_server import SyntheticBlog, make_synthetic_server, start_in_background
+
+RESULTS_FILE = os.path.join("benchmarks", "results.jsonl")
+
+
+def current_version():
+    """The git revision of the working tree, marked dirty when it has local changes"""
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True,
+                              text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB (ru_maxrss is KB on Linux, bytes on macOS)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class TreeMemorySampler:
+    """Peak resident memory of this process together with its subprocesses
+
+    Firefox and geckodriver run as subprocesses of a backup, so ru_maxrss
+    alone leaves the browser out. Needs psutil; without it peak() is None.
+    """
+
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        self.peak_bytes = max(self.peak_bytes, total)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        if psutil is not None:
+            self._thread = threading.Thread(target=self._run, name="memory-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self.sample()
+
+    def peak(self):
+        return round(self.peak_bytes / (1024 * 1024), 1) if self._thread is not None else None
+
+
+def run_backup(blog_url, options, queue):
+    """Back up blog_url in a fresh process and report its measurements on queue"""
+    # Keep TeletypeBackup's own console logging and progress bars out of the report
+    logging.basicConfig(handlers=[logging.NullHandler()])
+    os.environ['TQDM_DISABLE'] = '1'
+
+    output_dir = tempfile.mkdtemp(prefix="teletype_bench_")
+    sampler = TreeMemorySampler()
+    try:
+        from teletype import TeletypeBackup
+
+        sampler.start()
+        started = time.monotonic()
+        backup = TeletypeBackup(blog_url, output_dir=output_dir, **options)
+        backup.backup_with_sections()
+        elapsed = time.monotonic() - started
+        sampler.stop()
+
+        with open(os.path.join(output_dir, "backup_summary.json"), 'r', encoding='utf-8') as f:
+            summary = json.load(f)
+        queue.put({
+            "runtime": round(elapsed, 3),
+            "posts": summary['successful_downloads'],
+            "failed": summary['failed_downloads'],
+            "posts_per_sec": round(summary['successful_downloads'] / elapsed, 2) if elapsed else None,
+            # Python process plus browser subprocesses when psutil is installed
+            "peak_rss_mb": max(filter(None, [peak_rss_mb(), sampler.peak()]), default=None),
+            "python_peak_rss_mb": peak_rss_mb(),
+            "rss_includes_subprocesses": psutil is not None,
+            "bytes_written": directory_size(output_dir),
+            "browsers_started": summary.get('browsers_started')
+        })
+    except Exception as e:
+        queue.put({"error": str(e)})
+    finally:
+        sampler.stop()
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def run_configuration(blog, options):
+    """Serve the blog and run one backup configuration against it in a child process"""
+    server = make_synthetic_server(blog)
+    blog_url = start_in_background(server)
+    try:
+        queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=run_backup, args=(blog_url, options, queue))
+        process.start()
+        # Poll so that a child killed by the OOM killer, or one that died
+        # before reporting, ends this configuration instead of hanging
+        while True:
+            try:
+                result = queue.get(timeout=1)
+                break
+            except Empty:
+                if process.exitcode is not None:
+                    try:
+                        result = queue.get(timeout=1)
+                    except Empty:
+                        result = {"error": f"backup process exited with code {process.exitcode}"}
+                    break
+        process.join()
+        return result
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def find_corpus(root):
+    """Every original.html saved under a backup directory"""
+    for dirpath, _, files in os.walk(root):
+        if "original.html" in files:
+            yield os.path.join(dirpath, "original.html")
+
+
+def run_markdown(corpus_dir):
+    """Convert every post saved under corpus_dir to Markdown and measure the conversion alone"""
+    from teletype import extract_post, iter_markdown
+
+    contents = []
+    for path in find_corpus(corpus_dir):
+        with open(path, 'r', encoding='utf-8') as f:
+            content = extract_post(f.read())['content']
+        if content:
+            contents.append(content)
+    if not contents:
+        return {"error": f"no posts with content under {corpus_dir}"}
+
+    html_bytes = sum(len(content.encode('utf-8')) for content in contents)
+    markdown_bytes = 0
+    started = time.monotonic()
+    for content in contents:
+        for chunk in iter_markdown(content):
+            markdown_bytes += len(chunk.encode('utf-8'))
+    elapsed = time.monotonic() - started
+    return {
+        "runtime": round(elapsed, 3),
+        "posts": len(contents),
+        "posts_per_sec": round(len(contents) / elapsed, 2) if elapsed else None,
+        "html_mb_per_sec": round(html_bytes / (1024 * 1024) / elapsed, 2) if elapsed else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "bytes_written": markdown_bytes
+    }
+
+
+def load_previous(scenario):
+    """Latest stored result per configuration for the same scenario, from another version"""
+    previous = {}
+    if not os.path.exists(RESULTS_FILE):
+        return previous
+    version = current_version()
+    with open(RESULTS_FILE, 'r', encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            if record['scenario'] == scenario and record['version'] != version:
+                previous[record['configuration']] = record
+    return previous
+
+
+def format_row(values, widths):
+    return "  ".join(str(value).ljust(width) for value, width in zip(values, widths))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark TeletypeBackup against a local synthetic blog")
+    parser.add_argument('--posts', type=int, default=100)
+    parser.add_argument('--images', type=int, default=2, help="Images per post besides the shared cover")
+    parser.add_argument('--sections', type=int, default=3)
+    parser.add_argument('--image-size', type=int, default=400, help="Image width in pixels")
+    parser.add_argument('--latency', type=float, default=0.05, help="Seconds the server waits before every response")
+    parser.add_argument('--fetch-modes', nargs='+', default=['http'], choices=['auto', 'browser', 'http'],
+                        help="Fetch modes to benchmark; browser needs Firefox and geckodriver")
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 4], help="Post worker counts to benchmark")
+    parser.add_argument('--process-workers', nargs='+', type=int, default=[0],
+                        help="Post-processing pool sizes to benchmark; 0 processes posts on the fetching thread")
+    parser.add_argument('--engines', nargs='+', default=['threads'], choices=['threads', 'async'],
+                        help="Post download engines to benchmark; async needs aiohttp")
+    parser.add_argument('--markdown-corpus', metavar='DIR',
+                        help="Only benchmark HTML to Markdown conversion over the posts of an existing backup")
+    parser.add_argument('--no-save', action='store_true', help=f"Do not append the results to {RESULTS_FILE}")
+    args = parser.parse_args()
+
+    version = current_version()
+    if args.markdown_corpus:
+        scenario = {"markdown_corpus": os.path.abspath(args.markdown_corpus)}
+        previous = load_previous(scenario)
+        result = run_markdown(args.markdown_corpus)
+        if 'error' in result:
+            sys.exit(result['error'])
+        before = previous.get("markdown", {}).get('result', {}).get('posts_per_sec', "-")
+        print(f"Markdown conversion of {result['posts']} posts from {args.markdown_corpus} (version {version})")
+        print(f"{result['runtime']} s, {result['posts_per_sec']} posts/sec, {result['html_mb_per_sec']} MB/s of HTML, "
+              f"peak RSS {result['peak_rss_mb']} MB, previous posts/sec {before}")
+        if not args.no_save:
+            os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+            with open(RESULTS_FILE, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({"version": version, "date": datetime.now().isoformat(), "scenario": scenario,
+                                    "configuration": "markdown", "result": result}, ensure_ascii=False) + "\n")
+            print(f"Saved 1 result to {RESULTS_FILE}")
+        sys.exit(0)
+
+    blog = SyntheticBlog(posts=args.posts, images_per_post=args.images, sections=args.sections,
+                         image_size=args.image_size, latency=args.latency)
+    scenario = {
+        "posts": args.posts,
+        "images": args.images,
+        "sections": args.sections,
+        "image_size": args.image_size,
+        "latency": args.latency
+    }
+    previous = load_previous(scenario)
+
+    # Without psutil only the Python process is measured, not the browsers it starts
+    rss_header = "peak RSS (MB)" if psutil is not None else "Python RSS (MB)"
+    headers = ["configuration", "runtime (s)", "posts/sec", rss_header, "bytes written", "previous posts/sec"]
+    widths = [22, 12, 10, 14, 14, 18]
+    print(f"Synthetic blog: {args.posts} posts, {args.images} images each, {args.sections} sections, "
+          f"{args.latency * 1000:.0f} ms latency (version {version})")
+    print(format_row(headers, widths))
+
+    records = []
+    for engine in args.engines:
+        for fetch_mode in args.fetch_modes:
+            for workers in args.workers:
+                for process_workers in args.process_workers:
+                    configuration = f"{fetch_mode}/w{workers}" + (f"/p{process_workers}" if process_workers else "") \
+                        + (f"/{engine}" if engine != 'threads' else "")
+                    # No politeness delay against the local server; its latency stands in for the network
+                    result = run_configuration(blog, {"fetch_mode": fetch_mode, "workers": workers, "delay": 0,
+                                                      "process_workers": process_workers, "engine": engine})
+                    if 'error' in result:
+                        print(format_row([configuration, f"error: {result['error']}"], widths))
+                        continue
+
+                    before = previous.get(configuration, {}).get('result', {}).get('posts_per_sec', "-")
+                    print(format_row([configuration, result['runtime'], result['posts_per_sec'],
+                                      result['peak_rss_mb'], result['bytes_written'], before], widths))
+                    records.append({
+                        "version": version,
+                        "date": datetime.now().isoformat(),
+                        "scenario": scenario,
+                        "configuration": configuration,
+                        "result": result
+                    })
+
+    if records and not args.no_save:
+        os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+        with open(RESULTS_FILE, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        print(f"Saved {len(records)} results to {RESULTS_FILE}")
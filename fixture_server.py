@@ -0,0 +1,281 @@
+import os
+import json
+import time
+import zlib
+import random
+import struct
+import argparse
+import threading
+from functools import lru_cache
+from html import escape
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Content types whose bodies may contain absolute links to the recorded origins
+TEXT_TYPES = ('text/', 'xml', 'json', 'javascript')
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """Answer requests from a recording made with `teletype.py --record DIR`"""
+
+    # Set on the subclass created by make_replay_server
+    recording = None
+
+    def _respond(self, send_body):
+        entry = self.recording.lookup(self.path)
+        if entry is None:
+            self.send_error(404, "Not in recording")
+            return
+
+        # Links to every recorded host point back at this server, so the
+        # replayed blog and its images are served entirely offline
+        base_url = f"http://{self.headers.get('Host') or '%s:%s' % self.server.server_address[:2]}"
+        with open(os.path.join(self.recording.root, "bodies", entry['body']), 'rb') as f:
+            body = f.read()
+        content_type = entry.get('content_type') or ''
+        if any(kind in content_type for kind in TEXT_TYPES):
+            body = self.recording.rewrite(body, base_url)
+
+        self.send_response(entry['status'])
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        if entry.get('location'):
+            location = self.recording.rewrite(entry['location'].encode('utf-8'), base_url)
+            self.send_header('Location', location.decode('utf-8'))
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond(True)
+
+    def do_HEAD(self):
+        self._respond(False)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Recording:
+    """Index of recorded responses keyed by "<path>?<query>" """
+
+    def __init__(self, root):
+        self.root = root
+        with open(os.path.join(root, "index.json"), 'r', encoding='utf-8') as f:
+            self.index = json.load(f)
+        origins = set()
+        for entry in self.index.values():
+            parsed = urlparse(entry.get('url') or '')
+            if parsed.netloc:
+                origins.add(f"{parsed.scheme}://{parsed.netloc}")
+        # Longest first, so an origin is never partially replaced by a prefix of it
+        self.origins = sorted(origins, key=len, reverse=True)
+
+    def lookup(self, path):
+        return self.index.get(path)
+
+    def rewrite(self, body, base_url):
+        """Point absolute links to recorded origins at base_url"""
+        for origin in self.origins:
+            body = body.replace(origin.encode('utf-8'), base_url.encode('utf-8'))
+        return body
+
+
+def make_png(width, height, seed):
+    """A valid RGB PNG filled with seeded noise, so it compresses like a photo"""
+    rng = random.Random(seed)
+    raw = b"".join(b"\x00" + rng.randbytes(width * 3) for _ in range(height))
+    
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw, 6))
+            + chunk(b"IEND", b""))
+
+
+class SyntheticBlog:
+    """A generated Teletype-shaped blog: homepage, sections, listings and articles
+
+    Post p belongs to section p % sections, embeds images_per_post images of
+    its own plus one cover image shared by every post, and all pages are
+    server-rendered so the HTTP fetch path can back the blog up.
+    """
+
+    def __init__(self, posts=100, images_per_post=2, sections=3, image_size=400,
+                 paragraphs=5, latency=0.0):
+        self.posts = posts
+        self.images_per_post = images_per_post
+        self.sections = sections
+        self.image_size = image_size
+        self.paragraphs = paragraphs
+        self.latency = latency
+
+    def slug(self, post):
+        return f"post-{post:05d}"
+
+    def _card(self, post):
+        return (f'<div class="articleCard"><div class="articleCard-title">'
+                f'<a href="/{self.slug(post)}">Post {post}</a></div>'
+                f'<div class="articleCard-date">2024-01-{post % 28 + 1:02d}</div></div>')
+
+    def _page(self, title, body):
+        return f'<!DOCTYPE html><html><head><title>{escape(title)}</title></head><body>{body}</body></html>'
+
+    def homepage(self, section=None):
+        posts = [p for p in range(self.posts) if section is None or p % self.sections == section]
+        nav = "".join(f'<a class="blog__section_item" href="/s/section-{s}">Section {s}</a>'
+                      for s in range(self.sections))
+        info = ('<div class="blog__info"><div class="blog__info_name_text">Synthetic Blog</div>'
+                '<div class="blog__info_username">@synthetic</div>'
+                '<div class="blog__info_bio">Generated for benchmarks</div>'
+                '<div class="blog__info_items"><span class="blog__info_item">0 followers</span>'
+                '<span class="blog__info_item">0 following</span>'
+                f'<span class="blog__info_item">{self.posts} posts</span></div></div>')
+        cards = "".join(self._card(p) for p in posts)
+        return self._page("Synthetic Blog", f'{info}<nav>{nav}</nav><div class="blog__articles">{cards}</div>')
+
+    def article(self, post):
+        images = ['<img src="/img/cover.png">'] + [
+            f'<img src="/img/{post}-{i}.png">' for i in range(self.images_per_post)]
+        paragraphs = [f"<p>Paragraph {i} of post {post}. " + "Lorem ipsum dolor sit amet. " * 20 + "</p>"
+                      for i in range(self.paragraphs)]
+        content = "".join(paragraphs[:1] + images + paragraphs[1:])
+        body = (f'<article><h1 class="article__title">Post {post}</h1>'
+                f'<div class="article__date">2024-01-{post % 28 + 1:02d}</div>'
+                f'<div class="article__authorName">Synthetic Author</div>'
+                f'<div class="article__content">{content}</div></article>')
+        return self._page(f"Post {post} — Synthetic Blog", body)
+
+    def sitemap(self, base_url):
+        locs = "".join(f"<url><loc>{base_url}/{self.slug(p)}</loc></url>" for p in range(self.posts))
+        return ('<?xml version="1.0" encoding="UTF-8"?>'
+                f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{locs}</urlset>')
+
+    def api_page(self, page, page_size=20):
+        """A page of the JSON post listing; like some real endpoints, it never says how many
+        posts there are and answers out-of-range pages with the last page"""
+        last_page = max(1, -(-self.posts // page_size))
+        page = min(max(1, page), last_page)
+        posts = range((page - 1) * page_size, min(page * page_size, self.posts))
+        return json.dumps({"posts": [{"url": f"/{self.slug(p)}"} for p in posts]})
+
+    @lru_cache(maxsize=1024)
+    def image(self, name):
+        return make_png(self.image_size, self.image_size * 3 // 4, name)
+
+    def respond(self, path, base_url):
+        """Return (status, content type, body bytes) for a request path"""
+        parsed = urlparse(path)
+        path = parsed.path.rstrip('/') or '/'
+        if path == '/':
+            return 200, 'text/html; charset=utf-8', self.homepage().encode('utf-8')
+        if path.startswith('/s/section-'):
+            section = path[len('/s/section-'):]
+            if section.isdigit() and int(section) < self.sections:
+                return 200, 'text/html; charset=utf-8', self.homepage(int(section)).encode('utf-8')
+        if path == '/api/posts':
+            page = parse_qs(parsed.query).get('page', ['1'])[0]
+            if page.isdigit():
+                return 200, 'application/json', self.api_page(int(page)).encode('utf-8')
+        if path == '/sitemap.xml':
+            return 200, 'application/xml', self.sitemap(base_url).encode('utf-8')
+        if path.startswith('/img/') and path.endswith('.png'):
+            return 200, 'image/png', self.image(path[len('/img/'):-len('.png')])
+        if path.startswith('/post-'):
+            post = path[len('/post-'):]
+            if post.isdigit() and int(post) < self.posts:
+                return 200, 'text/html; charset=utf-8', self.article(int(post)).encode('utf-8')
+        return 404, 'text/plain', b"Not found"
+
+
+class SyntheticHandler(BaseHTTPRequestHandler):
+    """Serve a SyntheticBlog, sleeping for its latency before every response"""
+
+    # Set on the subclass created by make_synthetic_server
+    blog = None
+
+    def _respond(self, send_body):
+        if self.blog.latency:
+            time.sleep(self.blog.latency)
+        base_url = f"http://{self.headers.get('Host') or '%s:%s' % self.server.server_address[:2]}"
+        status, content_type, body = self.blog.respond(self.path, base_url)
+        # Validators let conditional requests from change detection come back 304
+        etag = f'"{zlib.crc32(body):08x}"'
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if status == 200:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond(True)
+
+    def do_HEAD(self):
+        self._respond(False)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_synthetic_server(blog, host='127.0.0.1', port=0):
+    """Create a server for a SyntheticBlog; port 0 picks a free port"""
+    handler = type('BoundSyntheticHandler', (SyntheticHandler,), {'blog': blog})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def make_replay_server(root, host='127.0.0.1', port=0):
+    """Create a server replaying the recording in root; port 0 picks a free port"""
+    handler = type('BoundReplayHandler', (ReplayHandler,), {'recording': Recording(root)})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def start_in_background(server):
+    """Serve on a daemon thread and return the server's base URL"""
+    thread = threading.Thread(target=server.serve_forever, name="fixture-server", daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Teletype fixture server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    commands = parser.add_subparsers(dest='command', required=True)
+    replay = commands.add_parser('replay', help="Replay responses recorded with teletype.py --record")
+    replay.add_argument('recording', help="Directory written by teletype.py --record")
+    synthetic = commands.add_parser('synthetic', help="Serve a generated Teletype-shaped blog")
+    synthetic.add_argument('--posts', type=int, default=100)
+    synthetic.add_argument('--images', type=int, default=2, help="Images per post besides the shared cover")
+    synthetic.add_argument('--sections', type=int, default=3)
+    synthetic.add_argument('--image-size', type=int, default=400, help="Image width in pixels")
+    synthetic.add_argument('--latency', type=float, default=0.0, help="Seconds to wait before every response")
+    args = parser.parse_args()
+
+    if args.command == 'replay':
+        server = make_replay_server(args.recording, args.host, args.port)
+        print(f"Replaying {args.recording} on http://{args.host}:{server.server_address[1]}")
+    else:
+        blog = SyntheticBlog(posts=args.posts, images_per_post=args.images, sections=args.sections,
+                             image_size=args.image_size, latency=args.latency)
+        server = make_synthetic_server(blog, args.host, args.port)
+        print(f"Serving a synthetic blog with {args.posts} posts on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
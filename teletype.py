@@ -2,128 +2,2443 @@ import os
 import re
 import json
 import time
+import sqlite3
+import hashlib
+import argparse
+import mimetypes
+import tempfile
+import shutil
+import zlib
+import io
+import math
+import html as htmllib
+from html.parser import HTMLParser
+import xml.etree.ElementTree as ElementTree
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from itertools import chain
+import threading
+import queue
+import asyncio
+from email.utils import parsedate_to_datetime
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from selenium import webdriver
 from selenium.webdriver.firefox.options import Options as FirefoxOptions
 from selenium.webdriver.firefox.service import Service as FirefoxService
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 from tqdm import tqdm
 import logging
 import time
 
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    from selectolax.parser import HTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+try:
+    import lxml  # noqa: F401
+    SOUP_PARSER = 'lxml'
+except ImportError:
+    SOUP_PARSER = 'html.parser'
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:98.0) Gecko/20100101 Firefox/98.0'
+
+# How pages are fetched: plain HTTP first with the browser as fallback,
+# browser only, or HTTP only
+FETCH_MODES = ('auto', 'browser', 'http')
+
+# Selectors that prove a page was rendered server-side with the content we need
+BLOG_SELECTORS = (".blog__info_name_text",)
+POST_SELECTORS = (".article__title", ".article__content")
+# A browser-rendered post is ready once its content is there; a missing
+# .article__title falls back to h1, so waiting for it would only time out
+POST_READY_SELECTORS = (".article__content, article",)
+CARD_SELECTORS = (".articleCard",)
+
+# What a listing card shows about its post, used to notice edited posts
+# without fetching them
+CARD_FIELDS = (("title", ".articleCard-title"), ("date", ".articleCard-date"),
+               ("snippet", ".articleCard-text, .articleCard-description"))
+
+# Formats the performance metrics can be exported in besides backup_summary.json
+METRICS_FORMATS = ('jsonl', 'prometheus')
+
+# Ways of enumerating posts: feeds with scrolling as fallback, feeds only, or
+# scrolling only
+DISCOVERY_MODES = ('auto', 'feed', 'scroll')
+
+# Keys under which a JSON listing endpoint may return its items, their URLs
+# and the total number of items
+FEED_ITEM_KEYS = ('articles', 'items', 'posts', 'data', 'results')
+FEED_URL_KEYS = ('url', 'link', 'href', 'uri', 'path', 'slug')
+FEED_TOTAL_KEYS = ('total', 'count', 'total_count', 'totalCount')
+
+# How a backup is stored: a directory tree, or one compressed SQLite archive
+OUTPUT_FORMATS = ('directory', 'archive')
+ARCHIVE_NAME = "archive.sqlite"
+
+# Formats images can be re-encoded in, and the stored types worth re-encoding
+IMAGE_FORMATS = ('webp', 'avif', 'jpeg')
+OPTIMIZABLE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.tif', '.tiff')
+IMAGE_WIDTHS = (480, 960, 1600)
+# What happens to an original once a smaller re-encoded copy exists
+ORIGINAL_POLICIES = ('keep', 'drop')
+
+# How posts are downloaded: worker threads with a fixed per-host delay, or
+# asyncio requests whose concurrency adapts to the server's responses
+ENGINES = ('threads', 'async')
+# Responses that mean the server wants fewer requests
+THROTTLE_STATUSES = (429, 503)
+# Latency growth the controller ignores, so jitter on fast servers is not read as overload
+LATENCY_TOLERANCE = 0.05
+
+# Full-text index of the posts, kept beside the backup in either format
+SEARCH_INDEX_NAME = "search.sqlite"
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# Batch runs interleave several blogs on the console, so name the blog
+BATCH_LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Assumed resident memory of one headless Firefox when it cannot be measured
+BROWSER_MEMORY_MB = 400
+
+# Title link href and the CARD_FIELDS texts of the .articleCard elements past
+# a given index, so each scroll only reads the cards it appended
+NEW_CARDS_SCRIPT = """
+var selectors = arguments[1];
+return Array.from(document.querySelectorAll('.articleCard')).slice(arguments[0]).map(function (card) {
+    var link = card.querySelector('.articleCard-title a');
+    return [link ? link.getAttribute('href') : null].concat(selectors.map(function (selector) {
+        var node = card.querySelector(selector);
+        return node ? node.textContent.trim() : null;
+    }));
+});
+"""
+
+# Remove the .articleCard elements before index arguments[0] and return how
+# many cards are left, keeping the DOM of an endlessly scrolled page small
+PRUNE_CARDS_SCRIPT = """
+var cards = document.querySelectorAll('.articleCard');
+var count = Math.min(arguments[0], cards.length);
+for (var i = 0; i < count; i++) {
+    cards[i].remove();
+}
+return cards.length - count;
+"""
+
+# Processed cards left in place when pruning, so the page still has
+# something to scroll past to trigger loading the next batch
+PRUNE_KEEP_CARDS = 10
+
+# Settings of --low-memory: restart the browser every 200 pages or past
+# 1500 MB, prune the DOM beyond 200 cards and spool discovered URLs to disk
+LOW_MEMORY_DEFAULTS = {'recycle_pages': 200, 'recycle_rss_mb': 1500, 'max_dom_cards': 200, 'spool_urls': True}
+
+
+def create_firefox_driver():
+    """Start a headless Firefox WebDriver"""
+    options = FirefoxOptions()
+    options.add_argument("--headless")
+    options.add_argument("--width=1920")
+    options.add_argument("--height=1080")
+    return webdriver.Firefox(options=options)
+
+
+def create_session():
+    """Create an HTTP session with the browser User-Agent"""
+    session = requests.Session()
+    session.headers.update({'User-Agent': USER_AGENT})
+    return session
+
+
+class SoupTree:
+    """A page parsed with BeautifulSoup, using lxml when it is installed"""
+
+    backend = SOUP_PARSER
+
+    def __init__(self, html):
+        self.root = BeautifulSoup(html, SOUP_PARSER)
+
+    def first(self, selector, node=None):
+        return (self.root if node is None else node).select_one(selector)
+
+    def all(self, selector, node=None):
+        return (self.root if node is None else node).select(selector)
+
+    def text(self, node, separator=''):
+        return node.get_text(separator)
+
+    def attr(self, node, name):
+        return node.get(name)
+
+    def html(self, node):
+        return str(node)
+
+
+class SelectolaxTree(SoupTree):
+    """A page parsed with selectolax's lexbor backend, several times faster than BeautifulSoup"""
+
+    backend = 'selectolax'
+
+    def __init__(self, html):
+        self.root = SelectolaxParser(html)
+
+    def first(self, selector, node=None):
+        return (self.root if node is None else node).css_first(selector)
+
+    def all(self, selector, node=None):
+        return (self.root if node is None else node).css(selector)
+
+    def text(self, node, separator=''):
+        return node.text(deep=True, separator=separator)
+
+    def attr(self, node, name):
+        return node.attributes.get(name)
+
+    def html(self, node):
+        return node.html
+
+
+@lru_cache(maxsize=16)
+def parse_html(html):
+    """Parse a page once with the fastest installed backend
+    
+    Identical HTML returns the cached tree, so the selector check of a fetch
+    and the extraction that follows share one parse. Trees are shared and
+    must not be modified.
+    """
+    return (SelectolaxTree if SelectolaxParser is not None else SoupTree)(html)
+
+
+def missing_selectors(html, selectors):
+    """Return the selectors that match nothing in the page"""
+    if not selectors:
+        return []
+    tree = parse_html(html)
+    return [selector for selector in selectors if tree.first(selector) is None]
+
+
+def extract_blog_page(html):
+    """Extract the blog info and section links of the homepage in one parse"""
+    tree = parse_html(html)
+
+    def text(selector):
+        node = tree.first(selector)
+        return tree.text(node).strip() if node is not None else None
+
+    username = text(".blog__info_username")
+    post_count = None
+    post_text = text(".blog__info_items .blog__info_item:nth-child(3)")
+    if post_text:
+        match = re.search(r'(\d+)', post_text)
+        if match:
+            post_count = int(match.group(1))
+    return {
+        "title": text(".blog__info_name_text"),
+        "username": username[1:] if username and username.startswith("@") else None,
+        "post_count": post_count,
+        "bio": text(".blog__info_bio"),
+        "sections": [(tree.attr(link, 'href'), tree.text(link).strip())
+                     for link in tree.all(".blog__section_item")]
+    }
+
+
+def extract_cards(html):
+    """Return the title link href and CARD_FIELDS texts of every .articleCard in the page
+    
+    Each card is a dict; href is None where the card has no title link.
+    """
+    tree = parse_html(html)
+    cards = []
+    for card in tree.all(".articleCard"):
+        link = tree.first(".articleCard-title a", card)
+        fields = {'href': tree.attr(link, 'href') if link is not None else None}
+        for name, selector in CARD_FIELDS:
+            node = tree.first(selector, card)
+            fields[name] = tree.text(node).strip() if node is not None else None
+        cards.append(fields)
+    return cards
+
+
+def listing_hash(listing):
+    """Fingerprint of the metadata a listing shows for a post"""
+    return hashlib.sha256(json.dumps(listing, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def extract_post(html):
+    """Extract a post's title, date, author, content HTML and image sources in one parse"""
+    tree = parse_html(html)
+
+    def text(*selectors):
+        for selector in selectors:
+            node = tree.first(selector)
+            if node is not None:
+                return tree.text(node).strip()
+        return None
+
+    title = text(".article__title")
+    if title is None:
+        # Fall back to the page heading, without the blog name
+        title = text("h1", "title")
+        if title and " — " in title:
+            title = title.split(" — ")[0].strip()
+
+    content = None
+    for selector in (".article__content", "article", ".post-content", ".entry-content"):
+        content = tree.first(selector)
+        if content is not None:
+            break
+    images = []
+    if content is not None:
+        images = [src for src in (tree.attr(img, 'src') for img in tree.all('img', content)) if src]
+
+    return {
+        'title': title,
+        'date': text(".article__date"),
+        'author': text(".article__authorName"),
+        'content': tree.html(content) if content is not None else None,
+        'text': " ".join(tree.text(content, ' ').split()) if content is not None else None,
+        'images': images
+    }
+
+
+IMG_SRC_PATTERN = re.compile(r'(<img\b[^>]*?\ssrc=)(["\'])(.*?)\2', re.IGNORECASE | re.DOTALL)
+
+
+IMG_TAG_PATTERN = re.compile(r'<img\b[^>]*>', re.IGNORECASE | re.DOTALL)
+RESPONSIVE_ATTR_PATTERN = re.compile(r'\s(?:srcset|sizes|loading)=(["\']).*?\1', re.IGNORECASE | re.DOTALL)
+
+
+def rewrite_image_sources(content, sources, srcsets=None):
+    """Replace the src of every <img> in serialized HTML found in the sources mapping
+    
+    Works on the serialized content so the shared parse tree stays untouched.
+    Images whose source has an entry in srcsets also get that srcset and
+    lazy loading, replacing whatever responsive attributes they had.
+    """
+    def replace(match):
+        new_src = sources.get(htmllib.unescape(match.group(3)))
+        if new_src is None:
+            return match.group(0)
+        return f'{match.group(1)}"{htmllib.escape(new_src)}"'
+    if not srcsets:
+        return IMG_SRC_PATTERN.sub(replace, content)
+    
+    def replace_tag(match):
+        tag = match.group(0)
+        src = IMG_SRC_PATTERN.search(tag)
+        srcset = srcsets.get(htmllib.unescape(src.group(3))) if src else None
+        tag = IMG_SRC_PATTERN.sub(replace, tag)
+        if not srcset:
+            return tag
+        tag = RESPONSIVE_ATTR_PATTERN.sub('', tag)
+        end = '/>' if tag.endswith('/>') else '>'
+        return f'{tag[:-len(end)].rstrip()} srcset="{htmllib.escape(srcset)}" loading="lazy"{end}'
+    return IMG_TAG_PATTERN.sub(replace_tag, content)
+
+
+def optimize_image(data, image_format, quality, widths):
+    """Re-encode an image at full size and at each narrower width in widths
+    
+    Module level so it can run in the image optimization process pool.
+    Returns [(width, bytes)] with the full-size copy first, or None for
+    animated images and data Pillow cannot read.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as opened:
+            if getattr(opened, 'is_animated', False):
+                return None
+            image = ImageOps.exif_transpose(opened)
+            if image.mode not in ('RGB', 'RGBA'):
+                transparent = 'A' in image.getbands() or 'transparency' in image.info
+                image = image.convert('RGBA' if transparent else 'RGB')
+            if image_format == 'jpeg' and image.mode == 'RGBA':
+                image = image.convert('RGB')
+            outputs = []
+            for width in [image.width] + sorted((w for w in widths if w < image.width), reverse=True):
+                resized = image if width == image.width else image.resize(
+                    (width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+                buffer = io.BytesIO()
+                resized.save(buffer, format=image_format.upper(), quality=quality)
+                outputs.append((width, buffer.getvalue()))
+            return outputs
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+
+def parse_post_page(html, selectors=()):
+    """Extract a post page and hash its title, date and content
+    
+    Module level so it can run in the post-processing process pool. The
+    selectors among selectors that match nothing are listed under
+    'missing', from the same parse.
+    """
+    extracted = extract_post(html)
+    extracted['missing'] = missing_selectors(html, selectors)
+    extracted['content_hash'] = hashlib.sha256("\0".join([
+        extracted['title'] or "", extracted['date'] or "", extracted['content'] or ""
+    ]).encode('utf-8')).hexdigest()
+    return extracted
+
+
+class MarkdownConverter(HTMLParser):
+    """Streaming HTML to Markdown converter for post content
+
+    Tags are handled as the parser reaches them and Markdown is passed to
+    write() straight away, so no intermediate copy of the document is built.
+    Images point at their local copies through local_sources.
+    """
+
+    HEADINGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+    BLOCK_TAGS = {'p', 'div', 'section', 'article', 'header', 'footer', 'main', 'aside',
+                  'figure', 'figcaption', 'table', 'dl', 'dt', 'dd'}
+    INLINE_MARKS = {'strong': '**', 'b': '**', 'em': '*', 'i': '*', 's': '~~', 'del': '~~', 'strike': '~~'}
+    SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'iframe'}
+    # Also raw HTML and the ampersand of text that would read as an entity
+    ESCAPE = re.compile(r'([\\`*_\[\]<]|&(?=#?\w+;))')
+    # Text at the start of a line that Markdown would read as a heading, quote,
+    # list item or thematic break
+    LINE_START = re.compile(r'^(?:[#>]|[-+](?=\s|$|[-+])|\d+(?=[.)](?:\s|$)))')
+
+    def __init__(self, write, local_sources=None):
+        super().__init__(convert_charrefs=True)
+        self._write = write
+        self.local_sources = local_sources or {}
+        # Trailing newlines written so far; the start counts as after a block
+        self._newlines = 2
+        # Blank line owed before the next line, written once its quote depth is known
+        self._blank = None
+        self._last = '\n'
+        self._quote = 0
+        self._lists = []
+        self._links = []
+        self._pre = 0
+        self._code = 0
+        self._code_text = []
+        self._skip = 0
+        self._item_start = False
+        self._cells = 0
+        self._rows = 0
+
+    def _emit(self, text):
+        if not text:
+            return
+        self._write(text)
+        stripped = text.rstrip('\n')
+        self._newlines = self._newlines + len(text) if not stripped else len(text) - len(stripped)
+        self._last = text[-1]
+        self._item_start = False
+
+    def _start_line(self, marker=''):
+        if self._blank is not None:
+            # Inside a quote the blank line keeps its marker so the quote continues
+            self._write('>' * min(self._blank, self._quote) + '\n')
+            self._blank = None
+        self._emit('> ' * self._quote + marker)
+
+    def _break(self, blank=True):
+        """End the current line, with a blank line after it when a new block starts"""
+        if self._item_start:
+            return
+        wanted = 2 if blank else 1
+        if self._newlines == 0:
+            self._emit('\n')
+        if self._newlines < wanted:
+            self._blank = self._quote
+            self._newlines = wanted
+
+    def _inline(self, text):
+        if self._newlines:
+            self._start_line('   ' * len(self._lists))
+        self._emit(text)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if self._skip or tag in self.SKIP_TAGS:
+            if tag in self.SKIP_TAGS:
+                self._skip += 1
+                if tag == 'iframe' and attrs.get('src') and self._skip == 1:
+                    # Embedded media becomes a link to its source
+                    self._break()
+                    self._start_line(f"[{attrs['src']}]({attrs['src']})")
+                    self._break()
+            return
+        if tag in self.HEADINGS:
+            self._break()
+            self._start_line('#' * int(tag[1]) + ' ')
+        elif tag in self.BLOCK_TAGS:
+            self._break()
+        elif tag == 'br':
+            self._emit('\n' if self._pre else '  \n')
+        elif tag == 'hr':
+            self._break()
+            self._start_line('---')
+            self._break()
+        elif tag == 'blockquote':
+            self._break()
+            self._quote += 1
+        elif tag in ('ul', 'ol'):
+            self._break(blank=not self._lists)
+            start = attrs.get('start') or ''
+            self._lists.append([tag == 'ol', int(start) if start.isdigit() else 1])
+        elif tag == 'li':
+            self._break(blank=False)
+            ordered, number = self._lists[-1] if self._lists else (False, 1)
+            if self._lists:
+                self._lists[-1][1] += 1
+            self._start_line('   ' * max(len(self._lists) - 1, 0) + (f"{number}. " if ordered else "- "))
+            self._item_start = True
+        elif tag == 'pre':
+            self._break()
+            self._start_line('```\n')
+            self._pre += 1
+        elif tag == 'code':
+            if not self._pre:
+                # Code spans are written whole at </code>, once the fence can be chosen
+                self._code += 1
+        elif tag in self.INLINE_MARKS:
+            if not self._code:
+                self._inline(self.INLINE_MARKS[tag])
+        elif tag == 'a':
+            # Links inside code spans would show up as literal brackets
+            href = attrs.get('href') if not self._code else None
+            self._links.append(href)
+            if href:
+                self._inline('[')
+        elif tag == 'img':
+            src = attrs.get('src')
+            if src:
+                alt = self.ESCAPE.sub(r'\\\1', attrs.get('alt') or '')
+                self._inline(f"![{alt}]({self.local_sources.get(src, src)})")
+        elif tag == 'tr':
+            self._break(blank=False)
+            self._start_line('|')
+            self._cells = 0
+        elif tag in ('td', 'th'):
+            self._emit(' ')
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self._skip = max(self._skip - 1, 0)
+            return
+        if self._skip:
+            return
+        if tag in self.HEADINGS or tag in self.BLOCK_TAGS:
+            self._break()
+            if tag == 'table':
+                self._rows = 0
+        elif tag == 'blockquote':
+            self._break(blank=False)
+            self._quote = max(self._quote - 1, 0)
+            self._break()
+        elif tag in ('ul', 'ol'):
+            if self._lists:
+                self._lists.pop()
+            self._break(blank=not self._lists)
+        elif tag == 'li':
+            self._break(blank=False)
+        elif tag == 'pre':
+            if self._newlines == 0:
+                self._emit('\n')
+            self._start_line('```')
+            self._pre = max(self._pre - 1, 0)
+            self._break()
+        elif tag == 'code':
+            if not self._pre and self._code:
+                self._code -= 1
+                if not self._code:
+                    self._code_span()
+        elif tag in self.INLINE_MARKS:
+            if not self._code:
+                self._emit(self.INLINE_MARKS[tag])
+        elif tag == 'a':
+            href = self._links.pop() if self._links else None
+            if href:
+                self._emit(f"]({href})")
+        elif tag in ('td', 'th'):
+            self._emit(' |')
+            self._cells += 1
+        elif tag == 'tr':
+            if self._rows == 0 and self._cells:
+                # Markdown tables need a separator after the header row
+                self._emit('\n')
+                self._start_line('|' + ' --- |' * self._cells)
+            self._rows += 1
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        if self._pre:
+            if self._quote:
+                data = data.replace('\n', '\n' + '> ' * self._quote)
+                if self._last == '\n':
+                    data = '> ' * self._quote + data
+            self._emit(data)
+            return
+        text = re.sub(r'\s+', ' ', data)
+        if self._code:
+            if not self._code_text and (self._newlines or self._last == ' '):
+                text = text.lstrip(' ')
+            self._code_text.append(text)
+            return
+        if self._newlines or self._last == ' ':
+            text = text.lstrip(' ')
+        if not text:
+            return
+        text = self.ESCAPE.sub(r'\\\1', text)
+        if self._newlines or self._item_start:
+            text = self.LINE_START.sub(lambda match: match.group(0) + '\\' if match.group(0)[0].isdigit()
+                                       else '\\' + match.group(0), text)
+        self._inline(text)
+
+    def _code_span(self):
+        """Write the collected code as a span fenced by more backticks than it contains"""
+        text = "".join(self._code_text)
+        self._code_text = []
+        if not text:
+            return
+        fence = '`' * (max((len(run) for run in re.findall(r'`+', text)), default=0) + 1)
+        pad = ' ' if text[0] == '`' or text[-1] == '`' else ''
+        if self._last == '`' and not self._newlines:
+            # A fence right after another would merge with it into a longer one
+            self._emit(' ')
+        self._inline(f"{fence}{pad}{text}{pad}{fence}")
+
+    def close(self):
+        super().close()
+        if self._newlines == 0:
+            self._emit('\n')
+
+
+def iter_markdown(content, local_sources=None, chunk_size=65536):
+    """Convert HTML content to Markdown, yielding the output as it is produced"""
+    chunks = []
+    converter = MarkdownConverter(chunks.append, local_sources)
+    for start in range(0, len(content), chunk_size):
+        converter.feed(content[start:start + chunk_size])
+        if chunks:
+            yield "".join(chunks)
+            chunks.clear()
+    converter.close()
+    if chunks:
+        yield "".join(chunks)
+
+
+def front_matter(post_data):
+    """YAML front matter for index.md; values are JSON strings, which YAML reads as quoted scalars"""
+    lines = ["---"]
+    for key in ('title', 'date', 'author'):
+        if post_data[key]:
+            lines.append(f"{key}: {json.dumps(post_data[key], ensure_ascii=False)}")
+    for key in ('url', 'slug'):
+        lines.append(f"{key}: {json.dumps(post_data[key], ensure_ascii=False)}")
+    return "\n".join(lines) + "\n---\n\n"
+
+
+def render_post(html, post_data, content, local_sources, stream=False, srcsets=None):
+    """Rewrite a post's image links and render original.html, index.md and post.json
+    
+    Module level so it can run in the post-processing process pool. Returns
+    the file names and their text; with stream, index.md is an iterator of
+    chunks converted as the sink writes them.
+    """
+    if content:
+        # Keep the HTML with updated image links in post.json
+        post_data['content'] = rewrite_image_sources(content, local_sources, srcsets)
+    
+    markdown = chain([front_matter(post_data)], iter_markdown(content, local_sources) if content else [])
+    return {
+        "original.html": html,
+        "index.md": markdown if stream else "".join(markdown),
+        "post.json": json.dumps(post_data, ensure_ascii=False, indent=2)
+    }
+
+
+class DirectorySink:
+    """Writes backup files into a directory tree, the default output format"""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.root, *name.split('/'))
+
+    def exists(self, name):
+        return os.path.exists(self._path(name))
+
+    def write(self, name, data):
+        """Write text, bytes or an iterable of chunks to name and return the bytes written"""
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        written = 0
+        with open(path, 'wb') as f:
+            for chunk in ([data] if isinstance(data, (str, bytes)) else data):
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                f.write(chunk)
+                written += len(chunk)
+        return written
+
+    def write_file(self, name, source_path):
+        """Move a finished file into place under name"""
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(source_path, path)
+        return os.path.getsize(path)
+
+    def read(self, name):
+        """Return the bytes of name, or None"""
+        try:
+            with open(self._path(name), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def remove(self, name):
+        try:
+            os.remove(self._path(name))
+        except FileNotFoundError:
+            pass
+
+    def names(self, prefix=''):
+        """Stored paths starting with prefix, in order"""
+        directory = prefix.rsplit('/', 1)[0] if '/' in prefix else ''
+        names = []
+        for dirpath, _, files in os.walk(self._path(directory) if directory else self.root):
+            for file in files:
+                name = os.path.relpath(os.path.join(dirpath, file), self.root).replace(os.sep, '/')
+                if name.startswith(prefix):
+                    names.append(name)
+        return sorted(names)
+
+    def close(self):
+        pass
+
+
+class ArchiveSink:
+    """Writes backup files as zlib-compressed blobs in one SQLite database
+
+    Rows are keyed by the path the file has in a directory backup, so one
+    post can be read or extracted through the primary key index without
+    scanning the archive. Images are stored as is, since they are already
+    compressed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                compressed INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                written_at TEXT
+            )
+        """)
+        self.conn.commit()
+
+    @staticmethod
+    def _compressible(name):
+        kind = mimetypes.guess_type(name)[0] or ''
+        return not kind.startswith(('image/', 'video/', 'audio/')) or kind == 'image/svg+xml'
+
+    def exists(self, name):
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM files WHERE path = ?", (name,)).fetchone() is not None
+
+    def write(self, name, data):
+        """Store text, bytes or an iterable of chunks under name and return the bytes stored"""
+        compressed = self._compressible(name)
+        compressor = zlib.compressobj(6) if compressed else None
+        parts = []
+        size = 0
+        for chunk in ([data] if isinstance(data, (str, bytes)) else data):
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            size += len(chunk)
+            parts.append(compressor.compress(chunk) if compressor else chunk)
+        if compressor:
+            parts.append(compressor.flush())
+        blob = b"".join(parts)
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO files (path, data, compressed, size, written_at) "
+                              "VALUES (?, ?, ?, ?, ?)",
+                              (name, blob, int(compressed), size, datetime.now().isoformat()))
+            self.conn.commit()
+        return len(blob)
+
+    def write_file(self, name, source_path):
+        """Store a finished file under name and remove it"""
+        with open(source_path, 'rb') as f:
+            written = self.write(name, f.read())
+        os.remove(source_path)
+        return written
+
+    def read(self, name):
+        """Return the bytes stored under name, or None"""
+        with self._lock:
+            row = self.conn.execute("SELECT data, compressed FROM files WHERE path = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        data, compressed = row
+        return zlib.decompress(data) if compressed else data
+
+    def remove(self, name):
+        with self._lock:
+            self.conn.execute("DELETE FROM files WHERE path = ?", (name,))
+            self.conn.commit()
+
+    def names(self, prefix=''):
+        """Stored paths starting with prefix, in order"""
+        with self._lock:
+            return [name for (name,) in self.conn.execute(
+                "SELECT path FROM files WHERE path >= ? AND path < ? ORDER BY path",
+                (prefix, prefix + '\uffff'))]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def linked_assets(text):
+    """Asset store paths that a saved post links to, in src, srcset or Markdown"""
+    return set(re.findall(r'\.\./\.\./assets/([^"\'\s),]+)', text))
+
+
+def extract_archive(archive_path, output_dir, slug=None):
+    """Recreate the directory layout of an archive backup in output_dir
+    
+    With slug, only that post and the images it links to are extracted.
+    Returns the number of files written.
+    """
+    if not os.path.exists(archive_path):
+        raise FileNotFoundError(f"No archive at {archive_path}")
+    archive = ArchiveSink(archive_path)
+    try:
+        if slug is None:
+            names = archive.names()
+        else:
+            names = archive.names(f"posts/{slug}/")
+            if not names:
+                raise ValueError(f"No post {slug} in {archive_path}")
+            # post.json holds the srcset variants of optimized images, which index.md does not link
+            text = "".join((archive.read(f"posts/{slug}/{name}") or b"").decode('utf-8', errors='replace')
+                           for name in ("index.md", "post.json"))
+            names += sorted("assets/" + path for path in linked_assets(text) if archive.exists("assets/" + path))
+        target = DirectorySink(output_dir)
+        for name in names:
+            target.write(name, archive.read(name))
+        return len(names)
+    finally:
+        archive.close()
+
+
+class Metrics:
+    """Thread-safe timers and counters for the phases of a backup
+
+    Timings are kept per name (e.g. 'phase.discovery', 'post.fetch') so that
+    percentiles can be reported; counters accumulate bytes, retries and
+    other totals.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timings = {}
+        self.counters = {}
+
+    @contextmanager
+    def timer(self, name):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - started)
+
+    def observe(self, name, seconds):
+        with self._lock:
+            self.timings.setdefault(name, []).append(seconds)
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @staticmethod
+    def _percentile(values, fraction):
+        """Nearest-rank percentile of an already sorted list"""
+        rank = max(0, math.ceil(fraction * len(values)) - 1)
+        return values[min(rank, len(values) - 1)]
+
+    def summary(self):
+        """Count, total, mean, p50, p95 and max of every timing, plus the counters"""
+        with self._lock:
+            timings = {name: sorted(values) for name, values in self.timings.items()}
+            counters = dict(self.counters)
+        return {
+            "timings": {
+                name: {
+                    "count": len(values),
+                    "total": round(sum(values), 3),
+                    "mean": round(sum(values) / len(values), 3),
+                    "p50": round(self._percentile(values, 0.5), 3),
+                    "p95": round(self._percentile(values, 0.95), 3),
+                    "max": round(values[-1], 3)
+                }
+                for name, values in sorted(timings.items())
+            },
+            "counters": dict(sorted(counters.items()))
+        }
+
+    def write_jsonl(self, path, labels):
+        """Write one JSON object per timing and counter"""
+        summary = self.summary()
+        with open(path, 'w', encoding='utf-8') as f:
+            for name, stats in summary['timings'].items():
+                f.write(json.dumps({"type": "timing", "name": name, **labels, **stats}, ensure_ascii=False) + "\n")
+            for name, value in summary['counters'].items():
+                f.write(json.dumps({"type": "counter", "name": name, **labels, "value": value}, ensure_ascii=False) + "\n")
+
+    def write_prometheus(self, path, labels):
+        """Write the metrics in the Prometheus text exposition format"""
+        def metric_labels(extra=None):
+            pairs = {**labels, **(extra or {})}
+            return ",".join(f'{key}="{str(value)}"' for key, value in pairs.items())
+        
+        summary = self.summary()
+        lines = [
+            "# HELP teletype_backup_duration_seconds Time spent per backup phase or step",
+            "# TYPE teletype_backup_duration_seconds summary"
+        ]
+        for name, stats in summary['timings'].items():
+            for key, quantile in (('p50', '0.5'), ('p95', '0.95')):
+                quantile_labels = metric_labels({"step": name, "quantile": quantile})
+                lines.append(f"teletype_backup_duration_seconds{{{quantile_labels}}} {stats[key]}")
+            lines.append(f"teletype_backup_duration_seconds_sum{{{metric_labels({'step': name})}}} {stats['total']}")
+            lines.append(f"teletype_backup_duration_seconds_count{{{metric_labels({'step': name})}}} {stats['count']}")
+        for name, value in summary['counters'].items():
+            metric = "teletype_backup_" + re.sub(r'[^a-zA-Z0-9_]', '_', name) + "_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{{{metric_labels()}}} {value}")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+
+
+class ResponseRecorder:
+    """Session response hook that saves every HTTP response for later replay
+
+    Bodies are written to <root>/bodies/ and index.json maps "<path>?<query>"
+    to the original URL, status, content type, redirect target and body
+    file; fixture_server.py serves a recording back so fetch paths can be
+    exercised offline.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(os.path.join(root, "bodies"), exist_ok=True)
+        self._lock = threading.Lock()
+        self.index_path = os.path.join(root, "index.json")
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+
+    def attach(self, session):
+        session.hooks['response'].append(self.record)
+        return session
+
+    def record(self, response, *args, **kwargs):
+        parsed = urlparse(response.url)
+        key = parsed.path or "/"
+        if parsed.query:
+            key += "?" + parsed.query
+        body_name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        with open(os.path.join(self.root, "bodies", body_name), 'wb') as f:
+            f.write(response.content)
+        with self._lock:
+            self.index[key] = {
+                "url": response.url,
+                "status": response.status_code,
+                "content_type": response.headers.get('Content-Type'),
+                "location": response.headers.get('Location'),
+                "body": body_name
+            }
+            with open(self.index_path, 'w', encoding='utf-8') as f:
+                json.dump(self.index, f, ensure_ascii=False, indent=2)
+
+
+class HostRateLimiter:
+    """Thread-safe minimum interval between requests to the same host
+    
+    intervals overrides min_interval for particular hosts.
+    """
+
+    def __init__(self, min_interval=1.0, intervals=None):
+        self.min_interval = min_interval
+        self.intervals = dict(intervals or {})
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def reserve(self, url):
+        """Take the next request slot for the URL's host, returning the seconds until it"""
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.intervals.get(host, self.min_interval)
+        return slot - now
+
+    def wait(self, url):
+        """Block until the next request slot for the URL's host is reached"""
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+
+def blog_name(url):
+    """Filesystem-safe name of a blog from its host and path, e.g. teletype.in__alice
+    
+    Blogs on a shared host such as teletype.in/@alice differ only by path.
+    """
+    parsed = urlparse(url)
+    return re.sub(r'[^\w\-.]', '_', (parsed.netloc + parsed.path.rstrip('/')) or url)
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header holding seconds or an HTTP date, or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(when.tzinfo)).total_seconds())
+
+
+class AdaptiveConcurrency:
+    """AIMD controller for the number of requests in flight, for use on one event loop
+
+    The limit grows by one per window of requests (additive increase) while
+    the smoothed latency stays within latency_factor of its lowest value, and is
+    halved (multiplicative decrease) on throttling statuses, timeouts,
+    server errors or latency beyond that bound, at most once per window.
+    A Retry-After header pauses every request until it has passed.
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=32, latency_factor=2.0, decrease=0.5):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.latency_factor = latency_factor
+        self.decrease = decrease
+        self.in_flight = 0
+        self.latency = None
+        self.best_latency = None
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._condition = None
+        self.counts = {'requests': 0, 'increases': 0, 'decreases': 0, 'throttled': 0, 'timeouts': 0,
+                       'errors': 0, 'retry_after_waits': 0}
+        self.lowest = self.highest = self.limit
+
+    async def acquire(self):
+        """Wait for a free slot under the current limit and any Retry-After pause"""
+        loop = asyncio.get_running_loop()
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        while True:
+            pause = self._paused_until - loop.time()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+            async with self._condition:
+                if self._paused_until > loop.time():
+                    continue
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                await self._condition.wait()
+
+    async def release(self, latency, status=None, timed_out=False, retry_after=None):
+        """Free a slot and adjust the limit from how the request went"""
+        now = asyncio.get_running_loop().time()
+        self.counts['requests'] += 1
+        if retry_after:
+            self._paused_until = max(self._paused_until, now + retry_after)
+            self.counts['retry_after_waits'] += 1
+        if timed_out or status in THROTTLE_STATUSES or (status and status >= 500):
+            self.counts['timeouts' if timed_out else 'throttled' if status in THROTTLE_STATUSES else 'errors'] += 1
+            self._decrease_limit(now)
+        elif status and status < 400:
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            self.best_latency = self.latency if self.best_latency is None else min(self.best_latency, self.latency)
+            if self.latency > max(self.best_latency * self.latency_factor, self.best_latency + LATENCY_TOLERANCE):
+                self._decrease_limit(now)
+            elif self.limit < self.maximum:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                self.counts['increases'] += 1
+                self.highest = max(self.highest, self.limit)
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def _decrease_limit(self, now):
+        # One decrease per window, so a burst of failures does not collapse the limit
+        if now - self._last_decrease < (self.latency or 1.0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit * self.decrease)
+        self.counts['decreases'] += 1
+        self.lowest = min(self.lowest, self.limit)
+
+    def state(self):
+        """Short view of the controller for progress output"""
+        return {"concurrency": int(self.limit), "in_flight": self.in_flight,
+                "latency_ms": round(self.latency * 1000) if self.latency is not None else None}
+
+    def summary(self):
+        """Final limit, its range over the run, latencies and counts of each signal"""
+        return {
+            "limit": round(self.limit, 2),
+            "lowest_limit": round(self.lowest, 2),
+            "highest_limit": round(self.highest, 2),
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+            "best_latency": round(self.best_latency, 3) if self.best_latency is not None else None,
+            **self.counts
+        }
+
+
+class WaitStats:
+    """Thread-safe record of how long each readiness wait actually took"""
+
+    # The fixed sleeps the readiness waits replaced, used to estimate time saved
+    FIXED_SLEEPS = {'page': 3.0, 'scroll': 2.0}
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.records = []
+
+    def record(self, url, kind, waited, timed_out):
+        with self._lock:
+            self.records.append({
+                "url": url,
+                "kind": kind,
+                "waited": round(waited, 3),
+                "timed_out": timed_out
+            })
+
+    def summary(self):
+        """Aggregate wait time compared to the fixed sleeps it replaced"""
+        with self._lock:
+            records = list(self.records)
+        total_wait = sum(record['waited'] for record in records)
+        fixed_total = sum(self.FIXED_SLEEPS[record['kind']] for record in records)
+        return {
+            "count": len(records),
+            "timeouts": sum(1 for record in records if record['timed_out']),
+            "total_wait": round(total_wait, 3),
+            "fixed_sleep_total": round(fixed_total, 3),
+            "saved": round(fixed_total - total_wait, 3)
+        }
+
+
+class PostIndex:
+    """Insertion-ordered set of post URLs that remembers the sections listing each post"""
+
+    def __init__(self):
+        self._sections = {}
+
+    def add(self, url, section=None):
+        """Add a post URL, returning True if it was not indexed yet"""
+        sections = self._sections.get(url)
+        is_new = sections is None
+        if is_new:
+            sections = self._sections[url] = []
+        if section and section not in sections:
+            sections.append(section)
+        return is_new
+
+    def sections(self, url):
+        return list(self._sections.get(url, ()))
+
+    def urls(self):
+        return list(self._sections)
+
+    def to_dict(self):
+        return {url: list(sections) for url, sections in self._sections.items()}
+
+    def items(self):
+        return ((url, list(sections)) for url, sections in self._sections.items())
+
+    def __contains__(self, url):
+        return url in self._sections
+
+    def __len__(self):
+        return len(self._sections)
+
+    def __iter__(self):
+        return iter(self._sections)
+
+
+class SpooledPostIndex:
+    """PostIndex kept in a scratch SQLite file instead of memory
+
+    Used by the memory-bounded crawl so the URLs of very large blogs are
+    written out as they are discovered. Iterating reads them back in
+    batches, so the index may be added to between batches.
+    """
+
+    BATCH = 500
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # Scratch data that is rebuilt on every run needs no journal
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode = OFF")
+        self.conn.execute("PRAGMA synchronous = OFF")
+        self.conn.execute("DROP TABLE IF EXISTS posts")
+        self.conn.execute("DROP TABLE IF EXISTS post_sections")
+        self.conn.execute("CREATE TABLE posts (position INTEGER PRIMARY KEY, url TEXT UNIQUE NOT NULL)")
+        self.conn.execute("CREATE TABLE post_sections (url TEXT NOT NULL, section TEXT NOT NULL, "
+                          "UNIQUE (url, section))")
+        self._count = 0
+
+    def add(self, url, section=None):
+        """Add a post URL, returning True if it was not indexed yet"""
+        with self._lock:
+            is_new = self.conn.execute("INSERT OR IGNORE INTO posts (url) VALUES (?)", (url,)).rowcount == 1
+            if section:
+                self.conn.execute("INSERT OR IGNORE INTO post_sections (url, section) VALUES (?, ?)",
+                                  (url, section))
+            if is_new:
+                self._count += 1
+        return is_new
+
+    def sections(self, url):
+        with self._lock:
+            return [row[0] for row in self.conn.execute(
+                "SELECT section FROM post_sections WHERE url = ? ORDER BY rowid", (url,))]
+
+    def urls(self):
+        return list(self)
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def items(self):
+        """Yield (url, sections) pairs in discovery order"""
+        for url in self:
+            yield url, self.sections(url)
+
+    def __contains__(self, url):
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM posts WHERE url = ?", (url,)).fetchone() is not None
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        position = 0
+        while True:
+            with self._lock:
+                rows = self.conn.execute("SELECT position, url FROM posts WHERE position > ? "
+                                         "ORDER BY position LIMIT ?", (position, self.BATCH)).fetchall()
+            if not rows:
+                return
+            position = rows[-1][0]
+            for _, url in rows:
+                yield url
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def iter_json_array(items):
+    """Serialize an iterable as an indented JSON array, one chunk per item"""
+    first = True
+    for item in items:
+        yield ("[\n  " if first else ",\n  ") + json.dumps(item, ensure_ascii=False)
+        first = False
+    yield "[]" if first else "\n]"
+
+
+def iter_json_object(pairs):
+    """Serialize (key, value) pairs as an indented JSON object, one chunk per pair"""
+    first = True
+    for key, value in pairs:
+        value = json.dumps(value, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+        yield ("{\n  " if first else ",\n  ") + f"{json.dumps(key, ensure_ascii=False)}: {value}"
+        first = False
+    yield "{}" if first else "\n}"
+
+
+class BackupManifest:
+    """SQLite record of every post in a stable output directory
+
+    Each post URL maps to its slug, content hash, last fetch time and status
+    ('pending', 'ok' or 'failed'), so an interrupted or repeated backup can
+    pick up where the previous one stopped. The listing hash, ETag and
+    Last-Modified seen for a post let later runs tell cheaply whether it
+    changed.
+    """
+
+    # Columns added after the first release, created on older manifests
+    FINGERPRINT_COLUMNS = ('listing_hash', 'etag', 'last_modified')
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS posts (
+                url TEXT PRIMARY KEY,
+                slug TEXT,
+                content_hash TEXT,
+                fetched_at TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                error TEXT
+            )
+        """)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(posts)")}
+        for column in self.FINGERPRINT_COLUMNS:
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE posts ADD COLUMN {column} TEXT")
+        self.conn.commit()
+        # Statuses are kept in memory for cheap lookups during discovery
+        self.statuses = dict(self.conn.execute("SELECT url, status FROM posts"))
+
+    def is_complete(self, url):
+        return self.statuses.get(url) == 'ok'
+
+    def content_hash(self, url):
+        with self._lock:
+            row = self.conn.execute("SELECT content_hash FROM posts WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def fingerprint(self, url):
+        """The listing hash, ETag and Last-Modified stored for url, each None if unknown"""
+        with self._lock:
+            row = self.conn.execute(f"SELECT {', '.join(self.FINGERPRINT_COLUMNS)} FROM posts WHERE url = ?",
+                                    (url,)).fetchone()
+        return dict(zip(self.FINGERPRINT_COLUMNS, row or (None,) * len(self.FINGERPRINT_COLUMNS)))
+
+    def add_pending(self, urls):
+        """Register newly discovered posts without touching known ones"""
+        with self._lock:
+            self.conn.executemany("INSERT OR IGNORE INTO posts (url) VALUES (?)", [(url,) for url in urls])
+            self.conn.commit()
+            for url in urls:
+                self.statuses.setdefault(url, 'pending')
+
+    def record(self, url, slug, status, content_hash=None, error=None, listing_hash=None, etag=None,
+               last_modified=None):
+        """Store the outcome of fetching a post"""
+        with self._lock:
+            self.conn.execute("""
+                INSERT INTO posts (url, slug, content_hash, fetched_at, status, error,
+                                   listing_hash, etag, last_modified)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    slug = excluded.slug,
+                    content_hash = COALESCE(excluded.content_hash, posts.content_hash),
+                    fetched_at = excluded.fetched_at,
+                    status = excluded.status,
+                    error = excluded.error,
+                    listing_hash = COALESCE(excluded.listing_hash, posts.listing_hash),
+                    etag = COALESCE(excluded.etag, posts.etag),
+                    last_modified = COALESCE(excluded.last_modified, posts.last_modified)
+            """, (url, slug, content_hash, datetime.now().isoformat(), status, error,
+                  listing_hash, etag, last_modified))
+            self.conn.commit()
+            self.statuses[url] = status
+
+    def urls(self):
+        """Every known post URL in the order it was first discovered"""
+        with self._lock:
+            return [row[0] for row in self.conn.execute("SELECT url FROM posts ORDER BY rowid")]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class SearchIndex:
+    """SQLite FTS5 index over the title, date, author and text of every saved post
+    
+    Posts are indexed as they are written and replaced when they are
+    written again, so incremental runs keep the index current without
+    rebuilding it.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS posts USING fts5(
+                url UNINDEXED, slug UNINDEXED, title, date, author, content,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """)
+        self.conn.commit()
+
+    @staticmethod
+    def available():
+        """Whether this sqlite3 build includes FTS5"""
+        try:
+            sqlite3.connect(':memory:').execute("CREATE VIRTUAL TABLE probe USING fts5(text)")
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    def __contains__(self, url):
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM posts WHERE url = ?", (url,)).fetchone() is not None
+
+    def add(self, post_data, text):
+        """Index a post, replacing what was indexed for its URL before"""
+        with self._lock:
+            self.conn.execute("DELETE FROM posts WHERE url = ?", (post_data['url'],))
+            self.conn.execute("INSERT INTO posts (url, slug, title, date, author, content) VALUES (?, ?, ?, ?, ?, ?)",
+                              (post_data['url'], post_data['slug'], post_data['title'] or "",
+                               post_data['date'] or "", post_data['author'] or "", text or ""))
+            self.conn.commit()
+
+    def search(self, query, limit=20):
+        """Best matches for an FTS5 query as dicts with a highlighted snippet of the text
+        
+        A query FTS5 cannot parse is searched for as plain words.
+        """
+        sql = ("SELECT url, slug, title, date, author, snippet(posts, 5, '[', ']', '…', 12) "
+               "FROM posts WHERE posts MATCH ? ORDER BY bm25(posts, 0, 0, 10.0, 1.0, 2.0, 1.0) LIMIT ?")
+        with self._lock:
+            try:
+                rows = self.conn.execute(sql, (query, limit)).fetchall()
+            except sqlite3.OperationalError:
+                words = " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+                rows = self.conn.execute(sql, (words, limit)).fetchall() if words else []
+        keys = ('url', 'slug', 'title', 'date', 'author', 'snippet')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class AssetStore:
+    """Blog-wide content-addressed store for downloaded images
+
+    Files are named by the SHA-256 of their bytes and sharded into
+    subdirectories (assets/ab/cd/abcd....jpg), so an image shared by many
+    posts is stored once. index.sqlite maps every source URL to its file,
+    and a URL that is already indexed never touches the network again.
+    The files themselves go to sink under prefix, a directory tree rooted
+    at root unless another output sink is given.
+    """
+
+    def __init__(self, root, metrics=None, sink=None, prefix=''):
+        self.root = root
+        self.metrics = metrics or Metrics()
+        os.makedirs(root, exist_ok=True)
+        self.sink = sink or DirectorySink(root)
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._url_locks = {}
+        self.conn = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS assets (
+                url TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                path TEXT NOT NULL,
+                size INTEGER,
+                content_type TEXT,
+                fetched_at TEXT,
+                etag TEXT,
+                last_modified TEXT
+            )
+        """)
+        # Indexes created before validators were stored lack their columns
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(assets)")}
+        for column in ('etag', 'last_modified'):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE assets ADD COLUMN {column} TEXT")
+        # Re-encoded copies of stored files, per optimization settings
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS optimized (
+                path TEXT PRIMARY KEY,
+                settings TEXT NOT NULL,
+                primary_path TEXT NOT NULL,
+                srcset TEXT NOT NULL,
+                original_size INTEGER,
+                optimized_size INTEGER,
+                variant_bytes INTEGER,
+                dropped INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        # Files each saved post links to, so originals are only dropped once no post needs them
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS post_assets (
+                post TEXT NOT NULL,
+                path TEXT NOT NULL,
+                PRIMARY KEY (post, path)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS post_assets_path ON post_assets (path)")
+        self.conn.commit()
+        self.paths = dict(self.conn.execute("SELECT url, path FROM assets"))
+        # Originals removed in favour of their re-encoded copies, with the settings of those copies
+        self.dropped = dict(self.conn.execute("SELECT path, settings FROM optimized WHERE dropped = 1"))
+        # Optimization settings of this run, set by AssetOptimizer; a dropped
+        # original only counts as stored while posts link to its copies instead
+        self.settings = None
+        self._revalidated = set()
+        self.downloaded = 0
+        self.reused = 0
+        self.not_modified = 0
+        self.retries = 0
+
+    def _extension(self, url, content_type):
+        ext = os.path.splitext(urlparse(url).path)[1].lower()
+        if re.fullmatch(r'\.[a-z0-9]{1,5}', ext):
+            return ext
+        if content_type:
+            ext = mimetypes.guess_extension(content_type.split(';')[0].strip())
+            if ext:
+                return ext
+        return ".bin"
+
+    def _url_lock(self, url):
+        with self._lock:
+            return self._url_locks.setdefault(url, threading.Lock())
+
+    def fetch(self, url, session, revalidate=False):
+        """Return the store-relative path of an image, downloading it only if the URL is new
+        
+        With revalidate, a known URL is checked once per run with a
+        conditional request, and a 304 reuses the stored file.
+        """
+        # Concurrent requests for one URL wait for the first download
+        with self._url_lock(url):
+            path = self.paths.get(url)
+            known = bool(path) and ((path in self.dropped and self.dropped[path] == self.settings)
+                                    or self.sink.exists(self.prefix + path))
+            if known and (not revalidate or url in self._revalidated):
+                with self._lock:
+                    self.reused += 1
+                return path
+            
+            headers = {}
+            if known:
+                with self._lock:
+                    etag, last_modified = self.conn.execute(
+                        "SELECT etag, last_modified FROM assets WHERE url = ?", (url,)).fetchone()
+                if etag:
+                    headers['If-None-Match'] = etag
+                if last_modified:
+                    headers['If-Modified-Since'] = last_modified
+            
+            started = time.monotonic()
+            response = session.get(url, stream=True, timeout=60, headers=headers)
+            retries = response.raw.retries
+            retry_count = len(retries.history) if retries else 0
+            self.metrics.increment('retries.assets', retry_count)
+            with self._lock:
+                self.retries += retry_count
+                if known:
+                    self._revalidated.add(url)
+            if known and response.status_code == 304:
+                response.close()
+                with self._lock:
+                    self.conn.execute("UPDATE assets SET fetched_at = ? WHERE url = ?",
+                                      (datetime.now().isoformat(), url))
+                    self.conn.commit()
+                    self.not_modified += 1
+                return path
+            if response.status_code != 200:
+                response.close()
+                return path if known else None
+            
+            # Hash while streaming to a temporary file, then hand it to the sink
+            digest = hashlib.sha256()
+            size = 0
+            fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=8192):
+                        digest.update(chunk)
+                        size += len(chunk)
+                        f.write(chunk)
+                sha256 = digest.hexdigest()
+                content_type = response.headers.get('Content-Type')
+                path = "/".join([sha256[:2], sha256[2:4], sha256 + self._extension(url, content_type)])
+                if self.sink.exists(self.prefix + path):
+                    os.remove(tmp_path)
+                else:
+                    self.sink.write_file(self.prefix + path, tmp_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            
+            with self._lock:
+                self.conn.execute("""
+                    INSERT OR REPLACE INTO assets
+                        (url, sha256, path, size, content_type, fetched_at, etag, last_modified)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, (url, sha256, path, size, content_type, datetime.now().isoformat(),
+                      response.headers.get('ETag'), response.headers.get('Last-Modified')))
+                if path in self.dropped:
+                    # The original is back, so it can be dropped again later
+                    self.conn.execute("UPDATE optimized SET dropped = 0 WHERE path = ?", (path,))
+                    del self.dropped[path]
+                self.conn.commit()
+                self.paths[url] = path
+                self.downloaded += 1
+            self.metrics.observe('asset.download', time.monotonic() - started)
+            self.metrics.increment('bytes.assets', size)
+            return path
+
+    def read(self, path):
+        """Return the bytes of a stored file, or None"""
+        return self.sink.read(self.prefix + path)
+
+    def write(self, path, data):
+        return self.sink.write(self.prefix + path, data)
+
+    def optimized(self, path, settings):
+        """The re-encoded copies of a stored file made with settings, or None"""
+        with self._lock:
+            row = self.conn.execute("SELECT primary_path, srcset FROM optimized WHERE path = ? AND settings = ?",
+                                    (path, settings)).fetchone()
+        if row is None:
+            return None
+        return {'primary': row[0], 'srcset': [tuple(entry) for entry in json.loads(row[1])]}
+
+    def record_optimized(self, path, settings, primary, srcset, original_size, optimized_size, variant_bytes):
+        """Store the re-encoded copies of a file"""
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO optimized VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                              (path, settings, primary, json.dumps(srcset), original_size, optimized_size,
+                               variant_bytes))
+            self.conn.commit()
+
+    def set_references(self, post, paths):
+        """Record the files a post links to, replacing what it linked to before"""
+        with self._lock:
+            self.conn.execute("DELETE FROM post_assets WHERE post = ?", (post,))
+            # The empty path marks the post as recorded even when it has no images
+            self.conn.executemany("INSERT OR IGNORE INTO post_assets (post, path) VALUES (?, ?)",
+                                  [(post, path) for path in set(paths) | {''}])
+            self.conn.commit()
+
+    def referencing_posts(self):
+        """Posts whose links are recorded"""
+        with self._lock:
+            return {row[0] for row in self.conn.execute("SELECT DISTINCT post FROM post_assets")}
+
+    def drop_unreferenced(self):
+        """Remove originals that have a smaller re-encoded copy and that no post links to
+        
+        Returns the number of originals removed.
+        """
+        with self._lock:
+            paths = self.conn.execute("""
+                SELECT path, settings FROM optimized
+                WHERE dropped = 0 AND primary_path != path
+                  AND NOT EXISTS (SELECT 1 FROM post_assets WHERE post_assets.path = optimized.path)
+            """).fetchall()
+        for path, settings in paths:
+            self.sink.remove(self.prefix + path)
+            with self._lock:
+                self.conn.execute("UPDATE optimized SET dropped = 1 WHERE path = ?", (path,))
+                self.conn.commit()
+                self.dropped[path] = settings
+        return len(paths)
+
+    def stats(self):
+        """Count indexed URLs, distinct stored files and their total size"""
+        with self._lock:
+            files, size = self.conn.execute("""
+                SELECT COUNT(*), COALESCE(SUM(size), 0)
+                FROM (SELECT MAX(size) AS size FROM assets GROUP BY sha256)
+            """).fetchone()
+        return {
+            "urls": len(self.paths),
+            "files": files,
+            "bytes": size,
+            "downloaded": self.downloaded,
+            "reused": self.reused,
+            "not_modified": self.not_modified,
+            "retries": self.retries
+        }
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class AssetOptimizer:
+    """Process pool that re-encodes stored images and renders narrower variants
+    
+    Each stored file is optimized once per settings: a full-size copy in
+    image_format and one copy per width in widths narrower than the image.
+    The full-size copy replaces the original in posts when it is smaller;
+    with the 'drop' policy the original is deleted at the end of the run
+    once no saved post links to it. Results are kept in the asset index,
+    so later runs reuse them.
+    """
+
+    def __init__(self, store, image_format='webp', quality=80, widths=IMAGE_WIDTHS, originals='keep',
+                 workers=None, metrics=None):
+        if Image is None:
+            raise ValueError("Image optimization needs Pillow (pip install pillow)")
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unknown image format: {image_format}")
+        Image.init()
+        if image_format.upper() not in Image.SAVE:
+            raise ValueError(f"This Pillow build cannot write {image_format}")
+        if originals not in ORIGINAL_POLICIES:
+            raise ValueError(f"Unknown original image policy: {originals}")
+        self.store = store
+        self.image_format = image_format
+        self.quality = quality
+        self.widths = tuple(sorted(set(widths)))
+        self.originals = originals
+        self.metrics = metrics or Metrics()
+        self.settings = f"{image_format}:q{quality}:" + ",".join(map(str, self.widths))
+        store.settings = self.settings
+        workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        # Threads wait on the process pool, one per image in flight
+        self.executor = ThreadPoolExecutor(max_workers=workers * 2, thread_name_prefix="image-worker")
+        self._lock = threading.Lock()
+        self._futures = {}
+        self.counts = {'optimized': 0, 'reused': 0, 'skipped': 0, 'dropped_originals': 0,
+                       'original_bytes': 0, 'optimized_bytes': 0, 'variant_bytes': 0}
+
+    def _count(self, **values):
+        with self._lock:
+            for key, value in values.items():
+                self.counts[key] += value
+
+    def _optimize(self, path):
+        existing = self.store.optimized(path, self.settings)
+        if existing is not None:
+            self._count(reused=1)
+            return existing
+        data = self.store.read(path) if os.path.splitext(path)[1].lower() in OPTIMIZABLE_EXTENSIONS else None
+        outputs = None
+        if data:
+            with self.metrics.timer('asset.optimize'):
+                outputs = self.pool.submit(optimize_image, data, self.image_format, self.quality,
+                                           self.widths).result()
+        if not outputs:
+            self._count(skipped=1)
+            return None
+        
+        base = os.path.splitext(path)[0]
+        extension = 'jpg' if self.image_format == 'jpeg' else self.image_format
+        (full_width, full), variants = outputs[0], outputs[1:]
+        # A re-encoded copy that came out larger than the original is not used
+        smaller = len(full) < len(data)
+        primary = f"{base}.w{full_width}.{extension}" if smaller else path
+        if smaller:
+            self.store.write(primary, full)
+        srcset = [(primary, full_width)]
+        variant_bytes = 0
+        for width, variant in variants:
+            variant_path = f"{base}.w{width}.{extension}"
+            self.store.write(variant_path, variant)
+            srcset.append((variant_path, width))
+            variant_bytes += len(variant)
+        primary_size = len(full) if smaller else len(data)
+        self.store.record_optimized(path, self.settings, primary, srcset, len(data), primary_size,
+                                    variant_bytes)
+        self._count(optimized=1, original_bytes=len(data), optimized_bytes=primary_size,
+                    variant_bytes=variant_bytes)
+        self.metrics.increment('bytes.images_saved', len(data) - primary_size)
+        return {'primary': primary, 'srcset': srcset}
+
+    def drop_originals(self):
+        """With the 'drop' policy, remove the originals no saved post links to any more"""
+        if self.originals != 'drop':
+            return 0
+        dropped = self.store.drop_unreferenced()
+        self._count(dropped_originals=dropped)
+        return dropped
+
+    def submit(self, path):
+        """Queue a stored file for optimization, returning a future of its copies or None"""
+        with self._lock:
+            future = self._futures.get(path)
+            if future is None:
+                future = self._futures[path] = self.executor.submit(self._optimize, path)
+            return future
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+        counts['bytes_saved'] = counts['original_bytes'] - counts['optimized_bytes']
+        return {"format": self.image_format, "quality": self.quality, "widths": list(self.widths),
+                "originals": self.originals, **counts}
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.pool.shutdown(wait=True)
+
+
+class AssetFetcher:
+    """Thread pool that downloads images into an AssetStore
+
+    The pool shares one session whose connection pool per CDN host is sized
+    to the number of workers, and which retries 429 and 5xx responses with
+    exponential backoff, honouring Retry-After.
+    """
+
+    def __init__(self, store, workers=8, retries=3, revalidate=False):
+        self.store = store
+        self.revalidate = revalidate
+        self.session = create_session()
+        retry = Retry(total=retries, backoff_factor=0.5,
+                      status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset(['GET']),
+                      respect_retry_after_header=True,
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=workers, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asset-worker")
+
+    def submit(self, url):
+        """Queue an image download, returning a future of its store-relative path"""
+        return self.executor.submit(self.store.fetch, url, self.session, self.revalidate)
+
+    def close(self):
+        """Wait for queued downloads and release the connection pool"""
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+
+class FetchContext:
+    """Browser and HTTP session used by a single worker
+
+    Pages are fetched with a plain GET first; the browser is only started
+    the first time a page turns out to need JavaScript rendering.
+    """
+
+    def __init__(self, rate_limiter, mode='auto', driver_factory=create_firefox_driver,
+                 session=None, logger=None, wait_stats=None, wait_timeout=10.0, metrics=None,
+                 recycle_pages=0, recycle_rss_mb=0, slots=None):
+        if mode not in FETCH_MODES:
+            raise ValueError(f"Unknown fetch mode: {mode}")
+        self.rate_limiter = rate_limiter
+        self.mode = mode
+        self.wait_stats = wait_stats or WaitStats()
+        self.wait_timeout = wait_timeout
+        self.metrics = metrics or Metrics()
+        self.driver_factory = driver_factory
+        self.session = session or create_session()
+        self.logger = logger or logging.getLogger("TeletypeBackup")
+        self._driver = None
+        self.browser_started = False
+        self.http_pages = 0
+        self.browser_pages = 0
+        # Restart the browser after this many pages or past this much memory
+        self.recycle_pages = recycle_pages
+        self.recycle_rss_mb = recycle_rss_mb
+        self._driver_pages = 0
+        self.browser_recycles = 0
+        # Shared semaphore capping concurrent page loads across backups
+        self.slots = slots or nullcontext()
+        # ETag and Last-Modified of the last page fetched, empty after a browser load
+        self.validators = {}
+
+    @property
+    def driver(self):
+        """The WebDriver, started on first use"""
+        if self._driver is None:
+            with self.metrics.timer('browser.start'):
+                self._driver = self.driver_factory()
+            self.browser_started = True
+        return self._driver
+
+    def browser_rss_mb(self):
+        """Resident memory of the running browser and its child processes, if psutil can tell"""
+        if psutil is None or self._driver is None:
+            return None
+        try:
+            process = psutil.Process(self._driver.service.process.pid)
+            processes = [process] + process.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+        except (AttributeError, psutil.Error):
+            return None
+
+    def recycle_if_needed(self):
+        """Quit the browser once it has loaded recycle_pages pages or grown past recycle_rss_mb
+        
+        The next page starts a fresh one, which gives back everything the
+        old one accumulated.
+        """
+        if self._driver is None:
+            return False
+        reason = None
+        if self.recycle_pages and self._driver_pages >= self.recycle_pages:
+            reason = f"after {self._driver_pages} pages"
+        elif self.recycle_rss_mb:
+            rss = self.browser_rss_mb()
+            if rss is not None and rss > self.recycle_rss_mb:
+                reason = f"at {rss:.0f} MB"
+        if reason is None:
+            return False
+        self.logger.info(f"Restarting browser {reason}")
+        self._quit_driver()
+        self.browser_recycles += 1
+        self.metrics.increment('browser.recycles')
+        return True
+
+    def _quit_driver(self):
+        try:
+            self._driver.quit()
+        except Exception:
+            pass
+        self._driver = None
+        self._driver_pages = 0
+
+    def get(self, url):
+        """Load a page in the browser, respecting the per-host rate limit"""
+        self.recycle_if_needed()
+        self.rate_limiter.wait(url)
+        driver = self.driver
+        with self.slots, self.metrics.timer('page.browser'):
+            driver.get(url)
+        self.browser_pages += 1
+        self._driver_pages += 1
+
+    def wait_for(self, url, selectors):
+        """Wait until every selector is present in the browser page, up to wait_timeout"""
+        started = time.monotonic()
+        timed_out = False
+        try:
+            for selector in selectors:
+                remaining = max(0.0, self.wait_timeout - (time.monotonic() - started))
+                WebDriverWait(self.driver, remaining, poll_frequency=0.2).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
+        except TimeoutException:
+            timed_out = True
+            self.logger.warning(f"Timed out waiting for {', '.join(selectors)} on {url}")
+        self.wait_stats.record(url, 'page', time.monotonic() - started, timed_out)
+        self.metrics.observe('wait.page', time.monotonic() - started)
+        return not timed_out
+
+    def scroll_for_more(self, url):
+        """Scroll to the bottom and wait until more .articleCard elements appear"""
+        previous = len(self.driver.find_elements(By.CSS_SELECTOR, ".articleCard"))
+        self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        started = time.monotonic()
+        try:
+            WebDriverWait(self.driver, self.wait_timeout, poll_frequency=0.2).until(
+                lambda driver: len(driver.find_elements(By.CSS_SELECTOR, ".articleCard")) > previous)
+            grew = True
+        except TimeoutException:
+            grew = False
+        self.wait_stats.record(url, 'scroll', time.monotonic() - started, not grew)
+        self.metrics.observe('wait.scroll', time.monotonic() - started)
+        return grew
+
+    def cards(self, start=0):
+        """Return the .articleCard elements from index start on as extract_cards does"""
+        rows = self.driver.execute_script(NEW_CARDS_SCRIPT, start, [selector for _, selector in CARD_FIELDS])
+        return [dict(zip(['href'] + [name for name, _ in CARD_FIELDS], row)) for row in rows]
+
+    def prune_cards(self, seen, max_cards):
+        """Remove processed .articleCard elements once more than max_cards were read
+        
+        Returns the number of cards left in the page, which is the index to
+        read new cards from afterwards.
+        """
+        if not max_cards or seen <= max_cards:
+            return seen
+        removed = seen - PRUNE_KEEP_CARDS
+        self.driver.execute_script(PRUNE_CARDS_SCRIPT, removed)
+        self.metrics.increment('browser.pruned_cards', removed)
+        return seen - removed
+
+    def fetch_http(self, url, selectors=()):
+        """Fetch a page with a plain GET, returning None unless every selector is present"""
+        self.rate_limiter.wait(url)
+        try:
+            with self.slots, self.metrics.timer('page.http'):
+                response = self.session.get(url, timeout=30)
+        except requests.RequestException as e:
+            self.logger.warning(f"HTTP fetch of {url} failed: {str(e)}")
+            self.metrics.increment('errors.pages')
+            return None
+        self.metrics.increment('bytes.pages', len(response.content))
+        if response.status_code != 200:
+            self.logger.warning(f"HTTP fetch of {url} returned {response.status_code}")
+            self.metrics.increment('errors.pages')
+            return None
+        
+        html = response.text
+        with self.metrics.timer('parse.selector_check'):
+            missing = missing_selectors(html, selectors)
+        if missing and self.mode != 'http':
+            self.logger.info(f"{url} is missing {', '.join(missing)} without JavaScript, using browser")
+            return None
+        self.http_pages += 1
+        self.validators = {key: response.headers.get(header) for key, header in
+                           (('etag', 'ETag'), ('last_modified', 'Last-Modified')) if response.headers.get(header)}
+        return html
+
+    def is_unchanged(self, url, etag=None, last_modified=None):
+        """Ask with a conditional HEAD whether url still matches the stored validators
+        
+        Any answer other than 304 or a 200 carrying the same ETag or
+        Last-Modified counts as changed.
+        """
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        self.rate_limiter.wait(url)
+        try:
+            with self.slots, self.metrics.timer('page.head'):
+                response = self.session.head(url, headers=headers, timeout=30, allow_redirects=True)
+        except requests.RequestException as e:
+            self.logger.warning(f"HEAD of {url} failed: {str(e)}")
+            self.metrics.increment('errors.pages')
+            return False
+        if response.status_code == 304:
+            return True
+        if response.status_code != 200:
+            return False
+        return bool((etag and response.headers.get('ETag') == etag)
+                    or (last_modified and response.headers.get('Last-Modified') == last_modified))
+
+    def fetch_page(self, url, selectors=(), ready=None):
+        """Return the page HTML, escalating to the browser only when needed
+        
+        The browser waits for the ready selectors, by default the same ones
+        the HTTP response is checked for.
+        """
+        if self.mode != 'browser':
+            html = self.fetch_http(url, selectors)
+            if html is not None:
+                return html
+            if self.mode == 'http':
+                raise RuntimeError(f"Could not fetch {url} over HTTP")
+        return self.fetch_browser(url, ready or selectors)
+
+    def fetch_browser(self, url, ready=()):
+        """Load a page in the browser and return its HTML once the ready selectors are present"""
+        self.get(url)
+        self.wait_for(url, ready)
+        self.validators = {}
+        return self.driver.page_source
+
+    def close(self):
+        """Quit the browser, if it was started, and close the HTTP session"""
+        if self._driver is not None:
+            self._quit_driver()
+        self.session.close()
+
+
 class TeletypeBackup:
-    def __init__(self, blog_url):
+    def __init__(self, blog_url, workers=1, delay=1.0, fetch_mode='auto', wait_timeout=10.0,
+                 output_dir=None, incremental=False, recheck=False, asset_workers=8,
+                 revalidate_assets=False, section_workers=1, browser_memory_cap=0,
+                 discovery='auto', feed_api=None, feed_workers=4, record_dir=None,
+                 metrics_format=None, process_workers=0, output_format='directory',
+                 recycle_pages=0, recycle_rss_mb=0, max_dom_cards=0, spool_urls=False,
+                 rate_limiter=None, fetch_slots=None, detect_changes=False, search_index=True,
+                 optimize_images=None, image_quality=80, image_widths=IMAGE_WIDTHS, originals='keep',
+                 image_workers=None, engine='threads', max_concurrency=16):
         self.blog_url = blog_url.rstrip('/')
+        self.scheme = urlparse(self.blog_url).scheme or 'https'
         self.domain = urlparse(self.blog_url).netloc
+        self.name = blog_name(self.blog_url)
         self.start_time = time.time()
+        self.metrics = Metrics()
+        if metrics_format and metrics_format not in METRICS_FORMATS:
+            raise ValueError(f"Unknown metrics format: {metrics_format}")
+        self.metrics_format = metrics_format
+        self.workers = max(1, workers)
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}")
+        if engine == 'async' and aiohttp is None:
+            raise ValueError("The async engine needs aiohttp (pip install aiohttp)")
+        self.engine = engine
+        # The async engine starts at workers requests in flight and adapts from there
+        self.rate_controller = AdaptiveConcurrency(initial=self.workers, maximum=max(self.workers, max_concurrency)) \
+            if engine == 'async' else None
+        self.async_pages = 0
+        # Pages fetched over HTTP that the process pool's check sent to the browser
+        self.escalated_pages = 0
+        self.section_workers = max(1, section_workers)
+        self.process_workers = max(0, process_workers)
+        self._process_pool = None
+        self.browser_memory_cap = browser_memory_cap
+        if discovery not in DISCOVERY_MODES:
+            raise ValueError(f"Unknown discovery mode: {discovery}")
+        self.discovery = discovery
+        self.feed_api = feed_api
+        self.feed_workers = max(1, feed_workers)
+        self.recorder = ResponseRecorder(record_dir) if record_dir else None
+        # Batch runs share one rate limiter and fetch semaphore between backups
+        self.rate_limiter = rate_limiter or HostRateLimiter(delay)
+        self.fetch_slots = fetch_slots
+        self.fetch_mode = fetch_mode
+        self.wait_timeout = wait_timeout
+        self.wait_stats = WaitStats()
+        # Memory-bounded crawling: browser restarts, DOM pruning while
+        # scrolling and discovered URLs spooled to disk
+        self.recycle_pages = max(0, recycle_pages)
+        self.recycle_rss_mb = max(0, recycle_rss_mb)
+        self.max_dom_cards = max(0, max_dom_cards)
+        if self.max_dom_cards:
+            self.max_dom_cards = max(self.max_dom_cards, PRUNE_KEEP_CARDS + 1)
+        self.spool_urls = spool_urls
+        self._spool_dir = None
+        self._spools = []
         
-        # Set up logging
-        self.output_dir = f"teletype_backup_{self.domain}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        # Incremental backups reuse one stable directory so the manifest
+        # carries over between runs
+        self.incremental = incremental
+        self.recheck = recheck
+        if output_dir:
+            self.output_dir = output_dir
+        elif incremental:
+            self.output_dir = f"teletype_backup_{self.name}"
+        else:
+            self.output_dir = f"teletype_backup_{self.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         os.makedirs(self.output_dir, exist_ok=True)
+        self.manifest = BackupManifest(os.path.join(self.output_dir, "manifest.sqlite")) if incremental else None
+        self.unchanged_posts = 0
+        # Listing metadata of each post, kept when saved posts are checked for changes
+        self.detect_changes = detect_changes and incremental
+        self.listing = {}
+        self.change_detection = {}
+        self._stats_lock = threading.Lock()
+        self.post_index = self._new_index()
+        # Archives hold the posts and images; logs and the indexes stay beside them
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {output_format}")
+        self.output_format = output_format
+        if output_format == 'archive':
+            self.sink = ArchiveSink(os.path.join(self.output_dir, ARCHIVE_NAME))
+            self.asset_store = AssetStore(os.path.join(self.output_dir, "assets"), metrics=self.metrics,
+                                          sink=self.sink, prefix="assets/")
+        else:
+            self.sink = DirectorySink(self.output_dir)
+            self.asset_store = AssetStore(os.path.join(self.output_dir, "assets"), metrics=self.metrics)
+        self.asset_fetcher = AssetFetcher(self.asset_store, workers=asset_workers,
+                                          revalidate=revalidate_assets)
+        self._record(self.asset_fetcher.session)
+        # Optional re-encoding of stored images into smaller, responsive copies
+        self.asset_optimizer = None
+        if optimize_images:
+            self.asset_optimizer = AssetOptimizer(self.asset_store, optimize_images, quality=image_quality,
+                                                  widths=image_widths, originals=originals,
+                                                  workers=image_workers, metrics=self.metrics)
+        self.search_index = None
+        if search_index and SearchIndex.available():
+            self.search_index = SearchIndex(os.path.join(self.output_dir, SEARCH_INDEX_NAME))
         
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(os.path.join(self.output_dir, 'backup.log'), encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
-        self.logger = logging.getLogger("TeletypeBackup")
-        
-        # Initialize selenium with Firefox
-        self.setup_selenium()
+        # Set up logging: the console handler is configured once per process,
+        # the log file belongs to this backup's own logger
+        logging.basicConfig(level=logging.INFO, format=LOG_FORMAT, handlers=[logging.StreamHandler()])
+        # Dots would make a blog on example.com.au a child logger of one on
+        # example.com, and log into its file
+        self.logger = logging.getLogger(f"TeletypeBackup.{self.name.replace('.', '_')}")
+        self.logger.setLevel(logging.INFO)
+        self._log_handler = logging.FileHandler(os.path.join(self.output_dir, 'backup.log'), encoding='utf-8')
+        self._log_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        self.logger.addHandler(self._log_handler)
+        self.error = None
+        if search_index and self.search_index is None:
+            self.logger.warning("This SQLite build has no FTS5, so no search index is built")
+        if self.engine == 'async' and fetch_mode == 'browser':
+            self.logger.warning("The async engine fetches over HTTP; with --fetch-mode browser posts use threads")
+        elif self.engine == 'async' and self.recorder is not None:
+            self.logger.warning("Post pages fetched by the async engine are not recorded")
         
         # Regular HTTP session for downloads
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:98.0) Gecko/20100101 Firefox/98.0'
-        })
+        self.session = self._record(create_session())
         
-        # Blog metadata
+        # The main thread's fetch context; download workers get their own.
+        # Firefox is only started once a page actually needs it.
+        self.context = self._create_context(session=self.session)
+        self._worker_local = threading.local()
+        self._worker_contexts = []
+        self._retired_contexts = []
+        self._worker_lock = threading.Lock()
+        
+        # Blog metadata; the homepage is kept for section discovery
+        self._homepage_html = None
         self.logger.info(f"Starting backup of blog at {self.blog_url}")
-        self.blog_info = self.get_blog_info()
+        try:
+            with self.metrics.timer('phase.blog_info'):
+                self.blog_info = self.get_blog_info()
+        except Exception:
+            self.close()
+            raise
         
+    @property
+    def driver(self):
+        """WebDriver of the main fetch context"""
+        return self.context.driver
+    
     def setup_selenium(self):
         """Initialize Selenium WebDriver with Firefox"""
         try:
-            options = FirefoxOptions()
-            options.add_argument("--headless")
-            options.add_argument("--width=1920")
-            options.add_argument("--height=1080")
-            
-            self.driver = webdriver.Firefox(options=options)
+            driver = create_firefox_driver()
             self.logger.info("Firefox WebDriver initialized successfully")
+            return driver
         except Exception as e:
             self.logger.error(f"Failed to initialize Firefox WebDriver: {str(e)}")
             raise
     
+    def _record(self, session):
+        """Attach the response recorder to a session when recording is enabled"""
+        if self.recorder:
+            self.recorder.attach(session)
+        return session
+    
+    def _create_context(self, session=None):
+        """Create a fetch context that starts its browser through setup_selenium"""
+        return FetchContext(self.rate_limiter, mode=self.fetch_mode,
+                            driver_factory=self.setup_selenium,
+                            session=session or self._record(create_session()), logger=self.logger,
+                            wait_stats=self.wait_stats, wait_timeout=self.wait_timeout,
+                            metrics=self.metrics, recycle_pages=self.recycle_pages,
+                            recycle_rss_mb=self.recycle_rss_mb, slots=self.fetch_slots)
+    
+    def _new_index(self):
+        """A PostIndex, or with spool_urls one that keeps its URLs on disk"""
+        if not self.spool_urls:
+            return PostIndex()
+        with self._stats_lock:
+            if self._spool_dir is None:
+                self._spool_dir = tempfile.mkdtemp(prefix="discovery_", dir=self.output_dir)
+            index = SpooledPostIndex(os.path.join(self._spool_dir, f"index_{len(self._spools)}.sqlite"))
+            self._spools.append(index)
+        return index
+    
+    def _write_output(self, name, data):
+        """Write a file of the backup to the output sink, counting the bytes written"""
+        self.metrics.increment('bytes.written', self.sink.write(name, data))
+    
     def log_time_elapsed(self, message):
         """Log message with time elapsed since start"""
         elapsed = time.time() - self.start_time
         elapsed_str = time.strftime("%H:%M:%S", time.gmtime(elapsed))
         self.logger.info(f"{message} - Time elapsed: {elapsed_str}")
     
+    def _worker_context(self):
+        """Return the calling worker thread's fetch context, creating it on first use"""
+        context = getattr(self._worker_local, 'context', None)
+        if context is None:
+            context = self._create_context()
+            self._worker_local.context = context
+            with self._worker_lock:
+                self._worker_contexts.append(context)
+            self.logger.info(f"Started fetch context for {threading.current_thread().name}")
+        return context
+    
+    def close(self):
+        """Shut down the post-processing pool and every browser and session owned by this backup"""
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=True)
+            self._process_pool = None
+        with self._worker_lock:
+            contexts, self._worker_contexts = self._worker_contexts, []
+        for context in contexts:
+            context.close()
+        self.context.close()
+        self.asset_fetcher.close()
+        if self.asset_optimizer is not None:
+            self.asset_optimizer.close()
+        self.asset_store.close()
+        if self.manifest:
+            self.manifest.close()
+        if self.search_index is not None:
+            self.search_index.close()
+            self.search_index = None
+        for index in self._spools:
+            index.close()
+        self._spools = []
+        if self._spool_dir is not None:
+            shutil.rmtree(self._spool_dir, ignore_errors=True)
+            self._spool_dir = None
+        if self._log_handler is not None:
+            self.logger.removeHandler(self._log_handler)
+            self._log_handler.close()
+            self._log_handler = None
+    
+    def _fetch_stats(self):
+        """Count pages served over plain HTTP and through the browser"""
+        with self._worker_lock:
+            contexts = [self.context] + self._worker_contexts + self._retired_contexts
+        return {
+            "pages_via_http": sum(context.http_pages for context in contexts) - self.escalated_pages,
+            "pages_via_browser": sum(context.browser_pages for context in contexts),
+            "pages_via_async": self.async_pages,
+            "browsers_started": sum(1 for context in contexts if context.browser_started),
+            "browser_recycles": sum(context.browser_recycles for context in contexts)
+        }
+    
+    def _parser_stats(self):
+        """HTML parsing backend and how often a page was served from the parse cache"""
+        cache = parse_html.cache_info()
+        return {
+            "backend": SelectolaxTree.backend if SelectolaxParser is not None else SoupTree.backend,
+            "cache_hits": cache.hits,
+            "cache_misses": cache.misses
+        }
+    
+    def _section_pool_size(self, section_count, per_browser=None):
+        """Number of section crawlers that fit the requested workers and the browser memory cap
+        
+        per_browser is the measured memory of one crawler's browser in MB;
+        without it each browser is assumed to take BROWSER_MEMORY_MB.
+        """
+        pool_size = min(self.section_workers, section_count)
+        if self.browser_memory_cap and pool_size > 1:
+            per_browser = per_browser or BROWSER_MEMORY_MB
+            allowed = max(1, int(self.browser_memory_cap // per_browser))
+            if allowed < pool_size:
+                self.logger.info(f"Browser memory cap of {self.browser_memory_cap} MB allows "
+                                 f"{allowed} section crawlers (~{per_browser:.0f} MB each)")
+                pool_size = allowed
+        return pool_size
+    
+    def crawl_sections(self, sections):
+        """Collect the posts of every section, crawling several at once when configured
+        
+        Takes a list of {'name', 'url'} dicts and returns their post URL
+        lists in the same order, so merging them keeps a stable post order.
+        """
+        section_pbar = tqdm(total=len(sections), 
+                          desc="Processing sections", 
+                          unit="section")
+        # With psutil the pool is sized from a real browser, measured on the first section
+        measure = bool(self.browser_memory_cap) and psutil is not None and min(self.section_workers, len(sections)) > 1
+        pool_size = self._section_pool_size(len(sections)) if not measure else self.section_workers
+        
+        if pool_size <= 1:
+            results = []
+            for section in sections:
+                section_pbar.set_description(f"Processing section: {section['name']}")
+                results.append(self.check_section_posts(section['url']))
+                section_pbar.update(1)
+            section_pbar.close()
+            return results
+        
+        # Each crawler thread gets its own browser, which is shut down once
+        # discovery is over so it does not linger during downloads
+        local = threading.local()
+        contexts = []
+        
+        def crawl(section):
+            context = getattr(local, 'context', None)
+            if context is None:
+                context = local.context = self._create_context()
+                with self._worker_lock:
+                    contexts.append(context)
+            return self.check_section_posts(section['url'], context)
+        
+        results = [None] * len(sections)
+        first = 0
+        try:
+            if measure:
+                section_pbar.set_description(f"Processing section: {sections[0]['name']}")
+                results[0] = crawl(sections[0])
+                section_pbar.update(1)
+                first = 1
+                per_browser = local.context.browser_rss_mb()
+                # The measuring browser would otherwise idle through the parallel crawl
+                local.context.close()
+                pool_size = self._section_pool_size(len(sections) - 1, per_browser)
+            section_pbar.set_description(f"Processing sections ({pool_size} crawlers)")
+            with ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="section-worker") as executor:
+                futures = {executor.submit(crawl, section): i for i, section in enumerate(sections) if i >= first}
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+                    section_pbar.update(1)
+        finally:
+            section_pbar.close()
+            for context in contexts:
+                context.close()
+            with self._worker_lock:
+                self._retired_contexts.extend(contexts)
+        return results
+    
     def get_blog_info(self):
         """Get basic blog information"""
         self.logger.info(f"Getting blog info from {self.blog_url}")
         
-        self.driver.get(self.blog_url)
-        time.sleep(3)  # Allow page to load fully
+        html = self.context.fetch_page(self.blog_url, BLOG_SELECTORS)
         
         # Save homepage for reference
-        with open(os.path.join(self.output_dir, "homepage.html"), 'w', encoding='utf-8') as f:
-            f.write(self.driver.page_source)
-            
-        soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-        
-        # Extract blog title
-        title = None
-        title_elements = soup.select(".blog__info_name_text")
-        if title_elements:
-            title = title_elements[0].get_text().strip()
-        
-        # Extract username
-        username = None
-        username_elements = soup.select(".blog__info_username")
-        if username_elements:
-            username_text = username_elements[0].get_text().strip()
-            if username_text.startswith("@"):
-                username = username_text[1:]
-        
-        # Extract post count
-        post_count = None
-        post_count_elements = soup.select(".blog__info_items .blog__info_item:nth-child(3)")
-        if post_count_elements:
-            post_text = post_count_elements[0].get_text().strip()
-            match = re.search(r'(\d+)', post_text)
-            if match:
-                post_count = int(match.group(1))
-        
-        # Extract bio
-        bio = None
-        bio_elements = soup.select(".blog__info_bio")
-        if bio_elements:
-            bio = bio_elements[0].get_text().strip()
+        self._write_output("homepage.html", html)
             
+        self._homepage_html = html
+        page = extract_blog_page(html)
+        title, username, post_count = page['title'], page['username'], page['post_count']
+        
         blog_info = {
             "title": title,
             "username": username,
             "post_count": post_count,
-            "bio": bio,
+            "bio": page['bio'],
             "url": self.blog_url
         }
         
         self.logger.info(f"Blog info: {title}, @{username}, {post_count} posts")
         
         # Save blog info
-        with open(os.path.join(self.output_dir, "blog_info.json"), 'w', encoding='utf-8') as f:
-            json.dump(blog_info, f, ensure_ascii=False, indent=2)
+        self._write_output("blog_info.json", json.dumps(blog_info, ensure_ascii=False, indent=2))
             
         return blog_info
     
@@ -132,12 +2447,12 @@ class TeletypeBackup:
         self.logger.info("Scrolling to find all post links...")
         
         # Load main blog page
-        self.driver.get(self.blog_url)
-        time.sleep(3)
+        self.context.get(self.blog_url)
+        self.context.wait_for(self.blog_url, CARD_SELECTORS)
         
         # Start collecting post URLs
-        post_urls = []
-        previous_count = 0
+        post_index = self._new_index()
+        seen_cards = 0
         max_attempts = 50  # Limit scrolling attempts
         
         # Create progress bar for scrolling
@@ -145,39 +2460,26 @@ class TeletypeBackup:
                    desc="Finding posts", 
                    unit="posts")
         
-        # Function to extract post URLs from current page state
-        def extract_posts():
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-            links = []
-            # Look for article cards with links
-            for article in soup.select(".articleCard"):
-                title_link = article.select_one(".articleCard-title a")
-                if title_link and title_link.get('href'):
-                    href = title_link.get('href')
-                    if href.startswith('/'):
-                        full_url = f"https://{self.domain}{href}"
-                    else:
-                        full_url = href
-                    links.append(full_url)
-            return links
-        
         # Scroll and collect posts
         stagnant_count = 0
         for scroll_count in range(max_attempts):
-            # Extract posts from current view
-            current_posts = extract_posts()
+            # Extract posts from the cards added since the last scroll
+            cards = self.context.cards(seen_cards)
+            seen_cards = self.context.prune_cards(seen_cards + len(cards), self.max_dom_cards)
+            new_urls = [url for url in self._read_cards(cards) if post_index.add(url)]
+            new_posts = len(new_urls)
             
-            # Count new posts found in this scroll
-            new_posts = 0
-            for url in current_posts:
-                if url not in post_urls:
-                    post_urls.append(url)
-                    new_posts += 1
+            # Everything past this point was saved by a previous run; change
+            # detection still needs their cards
+            if (self.manifest and not self.detect_changes and new_urls
+                    and all(self.manifest.is_complete(url) for url in new_urls)):
+                self.logger.info("Reached already backed-up posts, stopping.")
+                break
             
             # Update progress bar
             pbar.update(new_posts)
-            if len(post_urls) >= pbar.total:
-                pbar.total = len(post_urls) + 10  # Adjust total if we found more
+            if len(post_index) >= pbar.total:
+                pbar.total = len(post_index) + 10  # Adjust total if we found more
             
             # Check if we've made progress
             if new_posts == 0:
@@ -188,164 +2490,325 @@ class TeletypeBackup:
             else:
                 stagnant_count = 0
             
-            # Scroll down
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)  # Wait for content to load
+            # Scroll down and wait for more cards to load
+            if not self.context.scroll_for_more(self.blog_url):
+                self.logger.info("No more posts loaded after scrolling, stopping.")
+                break
             
             # If we found as many posts as expected, we can stop
-            if self.blog_info.get('post_count') and len(post_urls) >= self.blog_info['post_count']:
-                self.logger.info(f"Found all {len(post_urls)} posts, stopping scroll.")
+            if self.blog_info.get('post_count') and len(post_index) >= self.blog_info['post_count']:
+                self.logger.info(f"Found all {len(post_index)} posts, stopping scroll.")
                 break
         
         # Close progress bar
         pbar.close()
         
         # Save the list of post URLs
-        with open(os.path.join(self.output_dir, "post_urls.json"), 'w', encoding='utf-8') as f:
-            json.dump(post_urls, f, ensure_ascii=False, indent=2)
+        self._write_output("post_urls.json", iter_json_array(post_index))
             
-        self.log_time_elapsed(f"Found a total of {len(post_urls)} posts")
-        return post_urls
+        self.log_time_elapsed(f"Found a total of {len(post_index)} posts")
+        return post_index if self.spool_urls else post_index.urls()
     
-    def download_post(self, url):
+    def download_post(self, url, context=None):
         """Download and save a single post"""
+        return self.finish_post(self.start_post(url, context))
+    
+    def start_post(self, url, context=None):
+        """Fetch and parse a post, queueing its images on the asset fetcher
+        
+        Returns a pending post for finish_post, so that the images download
+        while the caller loads the next page.
+        """
+        context = context or self.context
+        pending = self._new_pending(url)
         try:
-            # Get the post slug for the directory name
-            parsed_url = urlparse(url)
-            slug = parsed_url.path.strip('/')
-            
-            # Ensure slug is valid for filesystem
-            safe_slug = re.sub(r'[^\w\-]', '_', slug)
-            post_dir = os.path.join(self.output_dir, 'posts', safe_slug)
-            os.makedirs(post_dir, exist_ok=True)
-            
             # Load the post page
-            self.driver.get(url)
-            time.sleep(3)  # Allow page to fully load
-            
-            # Save original HTML
-            with open(os.path.join(post_dir, "original.html"), 'w', encoding='utf-8') as f:
-                f.write(self.driver.page_source)
-                
-            # Parse the post content
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
+            with self.metrics.timer('post.fetch'):
+                html = context.fetch_page(url, POST_SELECTORS, POST_READY_SELECTORS)
+            pending['validators'] = context.validators
+        except Exception as e:
+            self._post_failed(pending, e)
+            return pending
+        self.process_post(pending, html)
+        return pending
+    
+    def _new_pending(self, url):
+        """A pending post for url, named after its path"""
+        slug = urlparse(url).path.strip('/')
+        
+        # Ensure slug is valid for filesystem
+        safe_slug = re.sub(r'[^\w\-]', '_', slug)
+        return {'url': url, 'slug': slug, 'safe_slug': safe_slug, 'ok': None,
+                'post_dir': f"posts/{safe_slug}"}
+    
+    def _run(self, pool, function, *args):
+        """Call function inline, or in the post-processing pool when one is given"""
+        if pool is None:
+            return function(*args)
+        return pool.submit(function, *args).result()
+    
+    def process_post(self, pending, html, pool=None, check=False):
+        """Parse a fetched post and queue its images, unless its content is unchanged
+        
+        With check, a page fetched over HTTP is checked for POST_SELECTORS
+        in the same parse; in auto mode a page missing them is marked with
+        'needs_browser' and left for the caller to load in the browser.
+        """
+        url = pending['url']
+        post_dir = pending['post_dir']
+        try:
+            # Parse the post content, reusing the tree of the selector check
+            # when running inline
+            with self.metrics.timer('post.parse'):
+                extracted = self._run(pool, parse_post_page, html, POST_SELECTORS if check else ())
+            if extracted['missing'] and self.fetch_mode == 'auto':
+                self.logger.info(f"{url} is missing {', '.join(extracted['missing'])} without JavaScript, "
+                                 f"using browser")
+                pending['needs_browser'] = True
+                return
             
             # Extract post metadata
             post_data = {
                 'url': url,
-                'slug': slug,
-                'title': None,
-                'date': None,
-                'author': None,
+                'slug': pending['slug'],
+                'title': extracted['title'],
+                'date': extracted['date'],
+                'author': extracted['author'] or self.blog_info.get('title'),
+                'sections': self.post_index.sections(url),
                 'content': None
             }
+            # What the listing and the server said about the post, for change detection
+            if self.listing.get(url):
+                post_data['listing'] = self.listing[url]
+            if pending.get('validators'):
+                post_data['validators'] = pending['validators']
             
-            # Title
-            title_elem = soup.select_one(".article__title")
-            if title_elem:
-                post_data['title'] = title_elem.get_text().strip()
-            else:
-                # Try other title selectors if needed
-                title_elem = soup.select_one("h1") or soup.select_one("title")
-                if title_elem:
-                    title_text = title_elem.get_text().strip()
-                    # Remove blog name if present
-                    if " — " in title_text:
-                        post_data['title'] = title_text.split(" — ")[0].strip()
-                    else:
-                        post_data['title'] = title_text
-            
-            # Date
-            date_elem = soup.select_one(".article__date")
-            if date_elem:
-                post_data['date'] = date_elem.get_text().strip()
-            
-            # Author
-            author_elem = soup.select_one(".article__authorName")
-            if author_elem:
-                post_data['author'] = author_elem.get_text().strip()
-            elif self.blog_info.get('title'):
-                post_data['author'] = self.blog_info['title']
-            
-            # Content
-            content_elem = soup.select_one(".article__content")
-            if not content_elem:
-                # Try alternative content selectors
-                content_elem = soup.select_one("article") or soup.select_one(".post-content") or soup.select_one(".entry-content")
-            
-            if content_elem:
-                # Download images and other assets
-                for img in content_elem.find_all('img'):
-                    if img.get('src'):
-                        img_url = img['src']
-                        if not img_url.startswith(('http://', 'https://')):
-                            img_url = urljoin(url, img_url)
-                        
-                        # Download the image
-                        try:
-                            img_filename = os.path.basename(urlparse(img_url).path)
-                            if not img_filename:
-                                img_filename = f"image_{hash(img_url) % 10000}.jpg"
-                            
-                            # Create assets directory
-                            assets_dir = os.path.join(post_dir, "assets")
-                            os.makedirs(assets_dir, exist_ok=True)
-                            
-                            # Download and save the image
-                            img_path = os.path.join(assets_dir, img_filename)
-                            response = self.session.get(img_url, stream=True)
-                            if response.status_code == 200:
-                                with open(img_path, 'wb') as f:
-                                    for chunk in response.iter_content(chunk_size=8192):
-                                        f.write(chunk)
-                                
-                                # Update the image source in HTML
-                                img['src'] = f"assets/{img_filename}"
-                        except Exception as e:
-                            self.logger.error(f"Error downloading image {img_url}: {str(e)}")
-                
-                # Save the content with updated image links
-                post_data['content'] = str(content_elem)
-            
-            # Create markdown content
-            md_content = f"---\n"
-            if post_data['title']:
-                md_content += f'title: "{post_data["title"]}"\n'
-            if post_data['date']:
-                md_content += f'date: "{post_data["date"]}"\n'
-            if post_data['author']:
-                md_content += f'author: "{post_data["author"]}"\n'
-            md_content += f'url: "{post_data["url"]}"\n'
-            md_content += f'slug: "{post_data["slug"]}"\n'
-            md_content += "---\n\n"
-            
-            if post_data['content']:
-                md_content += post_data['content']
-            
-            # Save as markdown file
-            with open(os.path.join(post_dir, "index.md"), 'w', encoding='utf-8') as f:
-                f.write(md_content)
-                
-            # Save post data as JSON
-            with open(os.path.join(post_dir, "post.json"), 'w', encoding='utf-8') as f:
-                json.dump(post_data, f, ensure_ascii=False, indent=2)
-                
+            # Skip rewriting a previously backed-up post whose content is unchanged
+            content_hash = extracted['content_hash']
+            if (self.manifest and self.manifest.content_hash(url) == content_hash
+                    and self.sink.exists(f"{post_dir}/post.json")):
+                self.manifest.record(url, pending['safe_slug'], 'ok', content_hash, **self._fingerprint(pending))
+                # Backups made before the search index existed get indexed as they are checked
+                if self.search_index is not None and url not in self.search_index:
+                    self.search_index.add(post_data, extracted['text'])
+                with self._stats_lock:
+                    self.unchanged_posts += 1
+                self.metrics.increment('posts.unchanged')
+                pending['ok'] = True
+                return
+            
+            # Queue images and other assets for download
+            images = []
+            for src in extracted['images']:
+                img_url = src
+                if not img_url.startswith(('http://', 'https://')):
+                    img_url = urljoin(url, img_url)
+                images.append((src, img_url, self.asset_fetcher.submit(img_url)))
+            
+            pending.update({
+                'html': html,
+                'post_data': post_data,
+                'content': extracted['content'],
+                'text': extracted['text'],
+                'content_hash': content_hash,
+                'images': images
+            })
+        except Exception as e:
+            self._post_failed(pending, e)
+    
+    def finish_post(self, pending, pool=None):
+        """Wait for a pending post's images, then write its HTML, Markdown and JSON"""
+        if pending['ok'] is not None:
+            return pending['ok']
+        
+        url = pending['url']
+        try:
+            assets_started = time.monotonic()
+            local_sources = {}
+            optimizing = []
+            for src, img_url, future in pending['images']:
+                try:
+                    asset_path = future.result()
+                    if asset_path:
+                        # Point the image at the asset store, relative to posts/<slug>/
+                        local_sources[src] = f"../../assets/{asset_path}"
+                        if self.asset_optimizer is not None:
+                            optimizing.append((src, self.asset_optimizer.submit(asset_path)))
+                except Exception as e:
+                    self.logger.error(f"Error downloading image {img_url}: {str(e)}")
+                    self.metrics.increment('errors.assets')
+            self.metrics.observe('post.assets_wait', time.monotonic() - assets_started)
+            
+            # Optimized images are shown through their smaller copies
+            srcsets = {}
+            for src, future in optimizing:
+                try:
+                    optimized = future.result()
+                except Exception as e:
+                    self.logger.error(f"Error optimizing image {src}: {str(e)}")
+                    self.metrics.increment('errors.assets')
+                    continue
+                if optimized:
+                    local_sources[src] = f"../../assets/{optimized['primary']}"
+                    srcsets[src] = ", ".join(f"../../assets/{path} {width}w" for path, width in optimized['srcset'])
+            
+            # Inline, the Markdown is converted while it is written
+            with self.metrics.timer('post.render'):
+                files = self._run(pool, render_post, pending['html'], pending['post_data'],
+                                  pending['content'], local_sources, pool is None, srcsets)
+            
+            with self.metrics.timer('post.write'):
+                for name, text in files.items():
+                    self._write_output(f"{pending['post_dir']}/{name}", text)
+            self.asset_store.set_references(pending['safe_slug'], linked_assets(
+                " ".join(list(local_sources.values()) + list(srcsets.values()))))
+            
+            if self.search_index is not None:
+                with self.metrics.timer('post.index'):
+                    self.search_index.add(pending['post_data'], pending['text'])
+            
+            if self.manifest:
+                self.manifest.record(url, pending['safe_slug'], 'ok', pending['content_hash'],
+                                     **self._fingerprint(pending))
+            pending['ok'] = True
             return True
             
         except Exception as e:
-            self.logger.error(f"Error downloading post {url}: {str(e)}")
-            return False
+            return self._post_failed(pending, e)
+        finally:
+            # Drop the page once it is written; the pipeline may hold many pending posts
+            pending.pop('html', None)
+            pending.pop('text', None)
+    
+    def _drop_unreferenced_originals(self):
+        """Remove optimized originals once no saved post, from this run or an earlier one, links to them"""
+        if self.asset_optimizer is None or self.asset_optimizer.originals != 'drop':
+            return
+        # Posts saved before links were recorded are read once to record theirs
+        recorded = self.asset_store.referencing_posts()
+        for name in self.sink.names("posts/"):
+            parts = name.split('/')
+            if len(parts) != 3 or parts[2] != "post.json" or parts[1] in recorded:
+                continue
+            text = "".join((self.sink.read(f"posts/{parts[1]}/{file}") or b"").decode('utf-8', errors='replace')
+                           for file in ("post.json", "index.md"))
+            self.asset_store.set_references(parts[1], linked_assets(text))
+        dropped = self.asset_optimizer.drop_originals()
+        if dropped:
+            self.logger.info(f"Removed {dropped} original images that no post links to any more")
+    
+    def _fingerprint(self, pending):
+        """Listing hash and HTTP validators of a fetched post, for the manifest"""
+        listing = self.listing.get(pending['url'])
+        validators = pending.get('validators') or {}
+        return {
+            'listing_hash': listing_hash(listing) if listing else None,
+            'etag': validators.get('etag'),
+            'last_modified': validators.get('last_modified')
+        }
     
-    def check_section_posts(self, section_url):
+    def _note_listing(self, url, listing):
+        """Remember what a listing shows for url; the first listing seen wins"""
+        if not self.detect_changes:
+            return
+        listing = {key: value for key, value in listing.items() if value}
+        if listing:
+            with self._stats_lock:
+                self.listing.setdefault(url, listing)
+    
+    def detect_changed_posts(self, urls):
+        """Return the saved posts among urls that may have changed since they were backed up
+        
+        A post whose listing metadata differs from the stored hash changed.
+        Otherwise a conditional HEAD decides when an ETag or Last-Modified
+        was stored, and matching listing metadata alone counts as unchanged.
+        Posts with nothing to compare are downloaded again.
+        """
+        def check(url):
+            stored = self.manifest.fingerprint(url)
+            listing = self.listing.get(url)
+            if listing and stored['listing_hash'] and listing_hash(listing) != stored['listing_hash']:
+                return url, 'listing_changed'
+            if stored['etag'] or stored['last_modified']:
+                context = self._worker_context() if self.workers > 1 else self.context
+                if context.is_unchanged(url, stored['etag'], stored['last_modified']):
+                    return url, 'unchanged'
+                return url, 'http_changed'
+            if listing and stored['listing_hash']:
+                return url, 'unchanged'
+            return url, 'unknown'
+        
+        counts = {'checked': len(urls), 'unchanged': 0, 'listing_changed': 0, 'http_changed': 0, 'unknown': 0}
+        changed = set()
+        with self.metrics.timer('phase.change_detection'):
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="change-check") as executor:
+                for url, outcome in executor.map(check, urls):
+                    counts[outcome] += 1
+                    if outcome != 'unchanged':
+                        changed.add(url)
+        self.metrics.increment('posts.unchanged_by_detection', counts['unchanged'])
+        self.change_detection = counts
+        self.logger.info(f"Change detection: {counts['unchanged']} of {len(urls)} saved posts unchanged, "
+                         f"{counts['listing_changed']} changed on the listing, {counts['http_changed']} "
+                         f"changed on the server, {counts['unknown']} without anything to compare")
+        return changed
+    
+    def _post_failed(self, pending, error):
+        """Log and record a post that could not be downloaded"""
+        url = pending['url']
+        self.logger.error(f"Error downloading post {url}: {str(error)}")
+        self.metrics.increment('errors.posts')
+        if self.manifest:
+            self.manifest.record(url, pending['safe_slug'], 'failed', error=str(error))
+        pending['ok'] = False
+        return False
+    
+    def _post_url(self, href):
+        """Make an .articleCard link absolute"""
+        if href.startswith('/'):
+            return f"{self.scheme}://{self.domain}{href}"
+        return href
+    
+    def _read_cards(self, cards):
+        """Return the post URLs of cards, noting what each card shows about its post"""
+        urls = []
+        for card in cards:
+            if card['href']:
+                url = self._post_url(card['href'])
+                self._note_listing(url, {name: card[name] for name, _ in CARD_FIELDS})
+                urls.append(url)
+        return urls
+    
+    def _card_urls(self, html):
+        """Return the unique post URLs of the .articleCard elements in a page"""
+        post_index = PostIndex()
+        for url in self._read_cards(extract_cards(html)):
+            post_index.add(url)
+        return post_index.urls()
+    
+    def check_section_posts(self, section_url, context=None):
         """Get posts from a specific section"""
+        context = context or self.context
         self.logger.info(f"Checking section: {section_url}")
         
-        self.driver.get(section_url)
-        time.sleep(3)  # Allow page to load
+        # The first page of the listing is server-rendered; when it already
+        # holds every post of the blog there is nothing to scroll for. Only
+        # the main page has a known post count, so in auto mode the other
+        # sections go straight to the browser instead of being fetched twice
+        expected = self.blog_info.get('post_count') if section_url == self.blog_url else None
+        if self.fetch_mode == 'http' or (self.fetch_mode == 'auto' and expected):
+            html = context.fetch_http(section_url, CARD_SELECTORS)
+            post_urls = self._card_urls(html) if html is not None else []
+            if self.fetch_mode == 'http' or len(post_urls) >= expected:
+                self.logger.info(f"Found {len(post_urls)} posts in section {section_url} without browser")
+                return post_urls
+        
+        context.get(section_url)
+        context.wait_for(section_url, CARD_SELECTORS)
         
         # Scroll to get all posts in this section
-        post_urls = []
-        previous_count = 0
+        post_index = self._new_index()
+        seen_cards = 0
         max_scrolls = 30
         
         # Create progress bar for scrolling this section
@@ -356,64 +2819,55 @@ class TeletypeBackup:
         for scroll in range(max_scrolls):
             pbar.update(1)
             
-            # Extract posts from current view
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-            for article in soup.select(".articleCard"):
-                title_link = article.select_one(".articleCard-title a")
-                if title_link and title_link.get('href'):
-                    href = title_link.get('href')
-                    if href.startswith('/'):
-                        full_url = f"https://{self.domain}{href}"
-                    else:
-                        full_url = href
-                    if full_url not in post_urls:
-                        post_urls.append(full_url)
+            # Extract posts from the cards added since the last scroll
+            cards = context.cards(seen_cards)
+            seen_cards = context.prune_cards(seen_cards + len(cards), self.max_dom_cards)
+            new_urls = [url for url in self._read_cards(cards) if post_index.add(url)]
             
             # Update progress description with count
-            pbar.set_description(f"Section {urlparse(section_url).path} ({len(post_urls)} posts)")
+            pbar.set_description(f"Section {urlparse(section_url).path} ({len(post_index)} posts)")
+            
+            # Everything past this point was saved by a previous run; change
+            # detection still needs their cards
+            if (self.manifest and not self.detect_changes and new_urls
+                    and all(self.manifest.is_complete(url) for url in new_urls)):
+                self.logger.info(f"Reached already backed-up posts in section {section_url}, stopping.")
+                break
             
             # Check if we found new posts
-            if len(post_urls) == previous_count:
+            if not new_urls:
                 # No new posts after scrolling, we're probably at the end
                 if scroll > 3:  # Give it a few scrolls to be sure
                     break
-            else:
-                previous_count = len(post_urls)
             
-            # Scroll down
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
+            # Scroll down and wait for more cards to load
+            if not context.scroll_for_more(section_url):
+                break
         
         pbar.close()
-        self.logger.info(f"Found {len(post_urls)} posts in section {section_url}")
-        return post_urls
+        self.logger.info(f"Found {len(post_index)} posts in section {section_url}")
+        return post_index if self.spool_urls else post_index.urls()
 
     def find_all_sections(self):
         """Find all sections in the blog"""
         self.logger.info("Finding all blog sections...")
         
-        self.driver.get(self.blog_url)
-        time.sleep(3)
+        # Reuse the homepage fetched for the blog info
+        html = self._homepage_html or self.context.fetch_page(self.blog_url, BLOG_SELECTORS)
         
         sections = []
         
         # Extract sections from the page
-        soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-        section_links = soup.select(".blog__section_item")
-        
-        for link in section_links:
-            href = link.get('href')
+        for href, section_name in extract_blog_page(html)['sections']:
             if href and href != self.blog_url and href != '/':
                 # Make sure it's a full URL
                 if href.startswith('/'):
-                    section_url = f"https://{self.domain}{href}"
+                    section_url = f"{self.scheme}://{self.domain}{href}"
                 elif not href.startswith('http'):
                     section_url = f"{self.blog_url}/{href.lstrip('/')}"
                 else:
                     section_url = href
                 
-                # Get the section name
-                section_name = link.get_text().strip()
                 sections.append({
                     'name': section_name,
                     'url': section_url
@@ -422,79 +2876,545 @@ class TeletypeBackup:
         self.logger.info(f"Found {len(sections)} sections")
         
         # Save sections info
-        with open(os.path.join(self.output_dir, "sections.json"), 'w', encoding='utf-8') as f:
-            json.dump(sections, f, ensure_ascii=False, indent=2)
+        self._write_output("sections.json", json.dumps(sections, ensure_ascii=False, indent=2))
             
         return sections
     
-    def backup_with_sections(self):
-        """Backup the blog by exploring all sections"""
+    def _fetch_feed(self, url):
+        """GET a feed document, returning the response or None if it is unavailable"""
+        self.rate_limiter.wait(url)
         try:
-            # Create posts directory
-            os.makedirs(os.path.join(self.output_dir, 'posts'), exist_ok=True)
+            with self.fetch_slots or nullcontext(), self.metrics.timer('page.feed'):
+                response = self.session.get(url, timeout=30)
+        except requests.RequestException as e:
+            self.logger.info(f"Feed {url} unavailable: {str(e)}")
+            return None
+        self.metrics.increment('bytes.pages', len(response.content))
+        if response.status_code != 200:
+            self.logger.info(f"Feed {url} unavailable: HTTP {response.status_code}")
+            return None
+        return response
+    
+    def _is_post_url(self, url, excluded):
+        """Whether a feed URL points at a post of this blog"""
+        url = url.rstrip('/')
+        if url == self.blog_url or url in excluded:
+            return False
+        return url.startswith(self.blog_url + '/')
+    
+    def _sitemap_post_urls(self, sitemap_url, excluded):
+        """Post URLs listed in a sitemap, fetching the children of a sitemap index in parallel"""
+        response = self._fetch_feed(sitemap_url)
+        if response is None:
+            return []
+        try:
+            root = ElementTree.fromstring(response.content)
+        except ElementTree.ParseError as e:
+            self.logger.info(f"Could not parse sitemap {sitemap_url}: {str(e)}")
+            return []
+        
+        locs = [elem.text.strip() for elem in root.iter() if elem.tag.endswith('loc') and elem.text]
+        if root.tag.endswith('sitemapindex'):
+            with ThreadPoolExecutor(max_workers=self.feed_workers, thread_name_prefix="feed-worker") as executor:
+                children = list(executor.map(lambda loc: self._sitemap_post_urls(loc, excluded), locs))
+            return [url for child in children for url in child]
+        
+        # A post's last modification date doubles as its listing metadata
+        for entry in root:
+            fields = {child.tag.rsplit('}', 1)[-1]: (child.text or "").strip() for child in entry}
+            if fields.get('loc') and fields.get('lastmod'):
+                self._note_listing(fields['loc'].rstrip('/'), {'lastmod': fields['lastmod']})
+        return [loc.rstrip('/') for loc in locs if self._is_post_url(loc, excluded)]
+    
+    def _rss_post_urls(self, feed_url, excluded):
+        """Post URLs listed in an RSS or Atom feed"""
+        response = self._fetch_feed(feed_url)
+        if response is None:
+            return []
+        try:
+            root = ElementTree.fromstring(response.content)
+        except ElementTree.ParseError as e:
+            self.logger.info(f"Could not parse feed {feed_url}: {str(e)}")
+            return []
+        
+        links = []
+        for elem in root.iter():
+            if elem.tag == 'link' and elem.text:
+                links.append(elem.text.strip())
+            elif elem.tag.endswith('}link') and elem.get('href'):
+                links.append(elem.get('href'))
+        return [link.rstrip('/') for link in links if self._is_post_url(link, excluded)]
+    
+    def _api_page(self, page):
+        """Fetch one page of the JSON listing endpoint, returning (post URLs, total or None)"""
+        page_size = 20
+        url = self.feed_api.format(page=page, offset=(page - 1) * page_size, limit=page_size,
+                                   username=self.blog_info.get('username') or "", domain=self.domain)
+        response = self._fetch_feed(url)
+        if response is None:
+            return [], None
+        try:
+            data = response.json()
+        except ValueError:
+            self.logger.info(f"Feed {url} did not return JSON")
+            return [], None
+        
+        total = None
+        items = data
+        if isinstance(data, dict):
+            total = next((data[key] for key in FEED_TOTAL_KEYS if isinstance(data.get(key), int)), None)
+            items = next((data[key] for key in FEED_ITEM_KEYS if isinstance(data.get(key), list)), [])
+        
+        urls = []
+        for item in items if isinstance(items, list) else []:
+            value = item if isinstance(item, str) else next(
+                (item[key] for key in FEED_URL_KEYS if isinstance(item, dict) and item.get(key)), None)
+            if value:
+                urls.append(value if value.startswith('http') else f"{self.blog_url}/{value.lstrip('/')}")
+        return urls, total
+    
+    def _api_post_urls(self, excluded):
+        """Post URLs from the paginated JSON endpoint, fetching pages in parallel"""
+        urls, total = self._api_page(1)
+        if not urls:
+            return []
+        pages = [urls]
+        
+        with ThreadPoolExecutor(max_workers=self.feed_workers, thread_name_prefix="feed-worker") as executor:
+            if total:
+                # The page count is known, so every page can be requested at once
+                page_count = -(-total // len(urls))
+                pages.extend(result[0] for result in executor.map(self._api_page, range(2, page_count + 1)))
+            else:
+                # Otherwise request a batch of pages at a time until one comes back
+                # empty or adds nothing new, which also ends endpoints that clamp
+                # out-of-range pages or templates that ignore the page number
+                seen = set(urls)
+                post_count = self.blog_info.get('post_count')
+                last_page = -(-post_count // len(urls)) + 1 if post_count else None
+                next_page = 2
+                while last_page is None or next_page <= last_page:
+                    end = next_page + self.feed_workers
+                    if last_page is not None:
+                        end = min(end, last_page + 1)
+                    batch = [result[0] for result in executor.map(self._api_page, range(next_page, end))]
+                    new = {url for page in batch for url in page} - seen
+                    pages.extend(batch)
+                    seen |= new
+                    if not new or any(not page for page in batch):
+                        break
+                    next_page = end
+        
+        return [url.rstrip('/') for page in pages for url in page if self._is_post_url(url, excluded)]
+    
+    def discover_from_feeds(self, sections):
+        """Enumerate posts from the JSON endpoint, sitemap or RSS feed instead of scrolling
+        
+        Sources are tried in that order. Returns the post URLs of the first
+        source that lists at least blog_info['post_count'] posts, and whether
+        that count was reached.
+        """
+        excluded = {section['url'].rstrip('/') for section in sections}
+        username = self.blog_info.get('username')
+        sources = []
+        if self.feed_api:
+            sources.append(("JSON endpoint", lambda: self._api_post_urls(excluded)))
+        sources.append(("sitemap", lambda: self._sitemap_post_urls(f"{self.blog_url}/sitemap.xml", excluded)))
+        sources.append(("RSS feed", lambda: self._rss_post_urls(f"{self.blog_url}/rss", excluded)))
+        if username:
+            sources.append(("Teletype RSS feed",
+                            lambda: self._rss_post_urls(f"https://teletype.in/rss/{username}", excluded)))
+        
+        expected = self.blog_info.get('post_count')
+        best = PostIndex()
+        for name, enumerate_posts in sources:
+            post_index = self._new_index()
+            for url in enumerate_posts():
+                post_index.add(url)
+            self.logger.info(f"{name} lists {len(post_index)} posts" + (f" of {expected}" if expected else ""))
+            if expected and len(post_index) >= expected:
+                return (post_index if self.spool_urls else post_index.urls()), True
+            if len(post_index) > len(best):
+                best = post_index
+        return (best if self.spool_urls else best.urls()), False
+    
+    def download_posts(self, urls):
+        """Download posts, concurrently when more than one worker is configured"""
+        successful = 0
+        failed = 0
+        
+        post_pbar = tqdm(total=len(urls), 
+                       desc="Downloading posts", 
+                       unit="post")
+        
+        # Pipelined processors record from their own threads
+        record_lock = threading.Lock()
+        
+        def record(ok):
+            nonlocal successful, failed
+            with record_lock:
+                if ok:
+                    successful += 1
+                else:
+                    failed += 1
+                post_pbar.update(1)
+                postfix = {"success": successful, "failed": failed}
+                if self.rate_controller is not None:
+                    postfix.update(self.rate_controller.state())
+                post_pbar.set_postfix(postfix)
+        
+        if self.engine == 'async' and self.fetch_mode != 'browser':
+            post_pbar.set_description(f"Downloading posts (async, up to {self.rate_controller.maximum} at once)")
+            asyncio.run(self._download_async(urls, record))
+        elif self.process_workers:
+            post_pbar.set_description(f"Downloading posts ({self.workers} fetchers, "
+                                      f"{self.process_workers} processes)")
+            self._download_pipelined(urls, record)
+        elif self.workers == 1:
+            # Finish each post only after the next page has loaded, so its
+            # images download in the background meanwhile
+            pending = None
+            for url in urls:
+                # Extract post name for better progress description
+                post_name = url.split('/')[-1]
+                post_pbar.set_description(f"Downloading post: {post_name}")
+                next_pending = self.start_post(url)
+                if pending:
+                    record(self.finish_post(pending))
+                pending = next_pending
+            if pending:
+                record(self.finish_post(pending))
+        else:
+            # Each worker thread drives its own browser; the shared rate
+            # limiter keeps the combined request rate polite
+            post_pbar.set_description(f"Downloading posts ({self.workers} workers)")
+            def worker(url):
+                return self.download_post(url, self._worker_context())
             
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="post-worker") as executor:
+                futures = [executor.submit(worker, url) for url in urls]
+                for future in as_completed(futures):
+                    record(future.result())
+        
+        post_pbar.close()
+        return successful, failed
+    
+    async def _acquire_fetch_slot(self):
+        """Wait for a shared fetch slot on an executor thread
+        
+        If the wait is cancelled, the slot that thread still goes on to
+        take is given back.
+        """
+        acquiring = asyncio.get_running_loop().run_in_executor(None, self.fetch_slots.acquire)
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            acquiring.add_done_callback(lambda future: future.cancelled() or self.fetch_slots.release())
+            raise
+    
+    async def _fetch_async(self, session, url):
+        """GET a post page under the adaptive concurrency limit, retrying throttled requests
+        
+        Returns the HTML and its validators, or None and the reason. The
+        controller replaces delay, but a host given its own interval (batch
+        rate_limits) keeps it, on the slot schedule the threads share.
+        """
+        controller = self.rate_controller
+        loop = asyncio.get_running_loop()
+        spaced = urlparse(url).netloc in self.rate_limiter.intervals
+        reason = None
+        for attempt in range(4):
+            if spaced:
+                delay = self.rate_limiter.reserve(url)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await controller.acquire()
+            started = loop.time()
+            status = None
+            timed_out = False
+            retry_after = None
+            slot = False
+            try:
+                if self.fetch_slots is not None:
+                    await self._acquire_fetch_slot()
+                    slot = True
+                async with session.get(url) as response:
+                    status = response.status
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    if status == 200:
+                        body = await response.read()
+                        self.metrics.increment('bytes.pages', len(body))
+                        html = body.decode(response.get_encoding(), errors='replace')
+                        validators = {key: response.headers[header] for key, header in
+                                      (('etag', 'ETag'), ('last_modified', 'Last-Modified'))
+                                      if response.headers.get(header)}
+                        return html, validators
+                    reason = f"HTTP {status}"
+            except asyncio.TimeoutError:
+                timed_out = True
+                reason = "timed out"
+            except aiohttp.ClientError as e:
+                reason = str(e)
+            finally:
+                if slot:
+                    self.fetch_slots.release()
+                self.metrics.observe('page.async', loop.time() - started)
+                await controller.release(loop.time() - started, status, timed_out, retry_after)
+            if not (timed_out or status in THROTTLE_STATUSES or (status and status >= 500)):
+                break
+            self.metrics.increment('retries.pages')
+        self.metrics.increment('errors.pages')
+        return None, reason
+    
+    def _complete_async(self, pending, html, pool):
+        """Parse and write a post fetched by the async engine, on an executor thread
+        
+        Without html, the page is loaded with the thread's browser first. A
+        fetched page that turns out to need JavaScript is left unfinished
+        for the caller to send to the browser; None is returned then.
+        """
+        url = pending['url']
+        if html is None:
+            context = self._worker_context()
+            try:
+                html = context.fetch_browser(url, POST_READY_SELECTORS)
+            except Exception as e:
+                return self._post_failed(pending, e)
+            pending['validators'] = {}
+            self.process_post(pending, html, pool)
+        else:
+            self.process_post(pending, html, pool, check=self.fetch_mode == 'auto')
+            if pending.pop('needs_browser', False):
+                return None
+            with self._stats_lock:
+                self.async_pages += 1
+        return self.finish_post(pending, pool)
+    
+    async def _download_async(self, urls, record):
+        """Fetch posts with asyncio under the AIMD concurrency controller
+        
+        Requests are not spaced by the fixed per-host delay; the controller
+        raises the number in flight while responses stay fast and backs off
+        on 429, 503, timeouts and Retry-After. Parsing, image handling and
+        writing run on a thread pool so the event loop only does I/O. Pages
+        that need the browser go to a separate pool of `workers` threads, so
+        no more browsers are started than with the threads engine.
+        """
+        pool = None
+        if self.process_workers:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers)
+            pool = self._process_pool
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=self.rate_controller.maximum, thread_name_prefix="post-processor")
+        browsers = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="post-browser")
+        timeout = aiohttp.ClientTimeout(total=30)
+        connector = aiohttp.TCPConnector(limit=self.rate_controller.maximum)
+        # Fetch no further ahead than the controller allows plus the posts being written
+        ahead = asyncio.Semaphore(self.rate_controller.maximum * 2)
+        
+        async def download(session, url):
+            async with ahead:
+                pending = self._new_pending(url)
+                with self.metrics.timer('post.fetch'):
+                    html, detail = await self._fetch_async(session, url)
+                ok = None
+                if html is not None:
+                    # detail holds the page's validators
+                    pending['validators'] = detail
+                    ok = await loop.run_in_executor(executor, self._complete_async, pending, html, pool)
+                elif self.fetch_mode == 'http':
+                    ok = self._post_failed(pending, RuntimeError(f"Could not fetch {url} over HTTP: {detail}"))
+                else:
+                    self.logger.warning(f"Async fetch of {url} failed ({detail}), using browser")
+                if ok is None:
+                    ok = await loop.run_in_executor(browsers, self._complete_async, pending, None, pool)
+            record(ok)
+        
+        try:
+            async with aiohttp.ClientSession(headers={'User-Agent': USER_AGENT}, timeout=timeout,
+                                             connector=connector) as session:
+                await asyncio.gather(*(download(session, url) for url in urls))
+        finally:
+            executor.shutdown(wait=True)
+            browsers.shutdown(wait=True)
+    
+    def _download_pipelined(self, urls, record):
+        """Fetch posts on threads and process them in a pool of processes
+        
+        Fetchers put raw pages on a bounded queue and block while it is full.
+        Each processor thread hands one page at a time to the process pool for
+        parsing, then for rewriting and writing once its images are in, so at
+        most process_workers pages are in the pool at once. Pages are only
+        parsed in the pool: in auto mode the pool's check for POST_SELECTORS
+        sends a page that needs JavaScript back to a fetcher for the browser.
+        """
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers)
+        pool = self._process_pool
+        pages = queue.Queue(maxsize=self.process_workers * 2)
+        stop = threading.Event()
+        fetching = []
+        fetching_lock = threading.Lock()
+        
+        def fetch(url, browser=False):
+            if stop.is_set():
+                return
+            pending = self._new_pending(url)
+            context = self._worker_context() if self.workers > 1 else self.context
+            try:
+                with self.metrics.timer('post.fetch'):
+                    html = None
+                    if not browser and self.fetch_mode != 'browser':
+                        html = context.fetch_http(url)
+                        if html is None and self.fetch_mode == 'http':
+                            raise RuntimeError(f"Could not fetch {url} over HTTP")
+                    checked = html is None
+                    if html is None:
+                        html = context.fetch_browser(url, POST_READY_SELECTORS)
+                pending['validators'] = context.validators
+            except Exception as e:
+                record(self._post_failed(pending, e))
+                return
+            while not stop.is_set():
+                try:
+                    pages.put((pending, html, checked), timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+        
+        def submit(url, browser=False):
+            with fetching_lock:
+                fetching.append(fetchers.submit(fetch, url, browser))
+        
+        def process():
+            while not stop.is_set():
+                try:
+                    item = pages.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if item is None:
+                    return
+                try:
+                    pending, html, checked = item
+                    self.process_post(pending, html, pool, check=not checked and self.fetch_mode == 'auto')
+                    if pending.get('needs_browser'):
+                        with self._stats_lock:
+                            self.escalated_pages += 1
+                        submit(pending['url'], browser=True)
+                    else:
+                        record(self.finish_post(pending, pool))
+                finally:
+                    pages.task_done()
+        
+        fetchers = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="post-fetcher")
+        processors = ThreadPoolExecutor(max_workers=self.process_workers, thread_name_prefix="post-processor")
+        try:
+            processing = [processors.submit(process) for _ in range(self.process_workers)]
+            for url in urls:
+                submit(url)
+            # Processed pages can queue browser fetches, so wait until a
+            # drained queue leaves no fetch behind
+            while True:
+                with fetching_lock:
+                    outstanding = [future for future in fetching if not future.done()]
+                for future in outstanding:
+                    future.result()
+                pages.join()
+                with fetching_lock:
+                    if all(future.done() for future in fetching):
+                        break
+            # Every page is processed; one sentinel per processor ends the stage
+            for _ in processing:
+                pages.put(None)
+            for future in processing:
+                future.result()
+        except BaseException:
+            # Unblock both stages so close() can quit the browsers
+            stop.set()
+            raise
+        finally:
+            fetchers.shutdown(wait=True)
+            processors.shutdown(wait=True)
+    
+    def export_metrics(self):
+        """Write the metrics as JSON lines or Prometheus text, if a format was chosen"""
+        labels = {"domain": self.domain}
+        if self.metrics_format == 'jsonl':
+            self.metrics.write_jsonl(os.path.join(self.output_dir, "metrics.jsonl"), labels)
+        elif self.metrics_format == 'prometheus':
+            self.metrics.write_prometheus(os.path.join(self.output_dir, "metrics.prom"), labels)
+    
+    def backup_with_sections(self):
+        """Backup the blog by exploring all sections
+        
+        Returns the summary also saved as backup_summary.json, or None if
+        the backup failed, in which case error holds the reason.
+        """
+        try:
             # Find all sections
-            sections = self.find_all_sections()
+            with self.metrics.timer('phase.find_sections'):
+                sections = self.find_all_sections()
             
             # Collect posts from each section
-            all_posts = []
+            self.post_index = self._new_index()
+            discovery_started = time.monotonic()
             
-            # Create progress bar for sections
-            section_pbar = tqdm(total=len(sections) + 1, 
-                              desc="Processing sections", 
-                              unit="section")
+            # Feeds are much cheaper than scrolling; fall back to scrolling
+            # unless they list every post the blog reports
+            feed_complete = False
+            feed_posts = []
+            if self.discovery != 'scroll':
+                feed_posts, feed_complete = self.discover_from_feeds(sections)
             
-            # Add main page (all posts)
-            section_pbar.set_description("Processing main page")
-            all_posts.extend(self.check_section_posts(self.blog_url))
-            section_pbar.update(1)
-            
-            # Add each section's posts
-            for section in sections:
-                section_pbar.set_description(f"Processing section: {section['name']}")
-                section_posts = self.check_section_posts(section['url'])
-                all_posts.extend(section_posts)
-                section_pbar.update(1)
-            
-            section_pbar.close()
-            
-            # Remove duplicates while preserving order
-            unique_posts = []
-            for post in all_posts:
-                if post not in unique_posts:
-                    unique_posts.append(post)
+            if feed_complete or self.discovery == 'feed':
+                for url in feed_posts:
+                    self.post_index.add(url)
+            else:
+                # Crawl the main page (all posts) and each section, then merge
+                # them in order so the post order does not depend on timing
+                main_page = {'name': None, 'url': self.blog_url}
+                results = self.crawl_sections([main_page] + sections)
+                for section, section_posts in zip([main_page] + sections, results):
+                    for url in section_posts:
+                        self.post_index.add(url, section['name'])
+                for url in feed_posts:
+                    self.post_index.add(url)
             
+            # A spooled index is read back from disk instead of copied into a list
+            unique_posts = self.post_index if self.spool_urls else self.post_index.urls()
+            self.metrics.observe('phase.discovery', time.monotonic() - discovery_started)
             self.log_time_elapsed(f"Found {len(unique_posts)} unique posts across all sections")
             
-            # Save post URLs
-            with open(os.path.join(self.output_dir, "post_urls.json"), 'w', encoding='utf-8') as f:
-                json.dump(unique_posts, f, ensure_ascii=False, indent=2)
+            # In incremental mode, posts from earlier runs that discovery
+            # stopped short of still belong to the backup
+            download_urls = unique_posts
+            if self.manifest:
+                self.manifest.add_pending(unique_posts)
+                for url in self.manifest.urls():
+                    self.post_index.add(url)
+                unique_posts = self.post_index if self.spool_urls else self.post_index.urls()
+                # Change detection narrows the saved posts down to those worth fetching again
+                changed = set()
+                if self.detect_changes:
+                    changed = self.detect_changed_posts(
+                        [url for url in unique_posts if self.manifest.is_complete(url)])
+                recheck_all = self.recheck and not self.detect_changes
+                download_urls = [url for url in unique_posts
+                                 if recheck_all or url in changed or not self.manifest.is_complete(url)]
+                self.logger.info(f"{len(unique_posts) - len(download_urls)} posts already backed up, "
+                                 f"{len(download_urls)} to download")
             
-            # Download each post with progress bar
-            successful = 0
-            failed = 0
+            # Save post URLs
+            self._write_output("post_urls.json", iter_json_array(unique_posts))
             
-            post_pbar = tqdm(total=len(unique_posts), 
-                           desc="Downloading posts", 
-                           unit="post")
+            # Save which sections list each post
+            self._write_output("post_sections.json", iter_json_object(self.post_index.items()))
             
-            for i, url in enumerate(unique_posts):
-                # Extract post name for better progress description
-                post_name = url.split('/')[-1]
-                post_pbar.set_description(f"Downloading post: {post_name}")
-                
-                if self.download_post(url):
-                    successful += 1
-                else:
-                    failed += 1
-                
-                post_pbar.update(1)
-                post_pbar.set_postfix({"success": successful, "failed": failed})
-                
-                # Be nice to the server
-                time.sleep(1)
-            
-            post_pbar.close()
+            # Download each post with progress bar
+            with self.metrics.timer('phase.download'):
+                successful, failed = self.download_posts(download_urls)
+            self._drop_unreferenced_originals()
             
             # Calculate elapsed time
             elapsed = time.time() - self.start_time
@@ -507,33 +3427,346 @@ class TeletypeBackup:
                 "title": self.blog_info.get('title'),
                 "username": self.blog_info.get('username'),
                 "sections": len(sections),
+                "discovery": "feed" if feed_complete or self.discovery == 'feed' else "scroll",
                 "total_posts": len(unique_posts),
                 "successful_downloads": successful,
                 "failed_downloads": failed,
+                "incremental": self.incremental,
+                "skipped_posts": len(unique_posts) - len(download_urls),
+                "unchanged_posts": self.unchanged_posts,
+                "change_detection": self.change_detection,
+                "indexed_posts": len(self.search_index) if self.search_index is not None else None,
+                "fetch_mode": self.fetch_mode,
+                "process_workers": self.process_workers,
+                "output_format": self.output_format,
+                **self._fetch_stats(),
+                "waits": self.wait_stats.summary(),
+                "assets": self.asset_store.stats(),
+                "image_optimization": self.asset_optimizer.stats() if self.asset_optimizer is not None else None,
+                "engine": self.engine,
+                "rate_control": self.rate_controller.summary() if self.rate_controller is not None else None,
+                "metrics": self.metrics.summary(),
+                "parser": self._parser_stats(),
                 "backup_date": datetime.now().isoformat(),
                 "elapsed_time": elapsed_str
             }
             
             with open(os.path.join(self.output_dir, "backup_summary.json"), 'w', encoding='utf-8') as f:
                 json.dump(summary, f, ensure_ascii=False, indent=2)
+            
+            # Save per-page wait times
+            with open(os.path.join(self.output_dir, "wait_times.json"), 'w', encoding='utf-8') as f:
+                json.dump(self.wait_stats.records, f, ensure_ascii=False, indent=2)
+            
+            # Export metrics for monitoring
+            self.export_metrics()
                 
             self.log_time_elapsed(f"Backup complete! Saved {successful}/{len(unique_posts)} posts to {self.output_dir}")
+            return summary
             
         except Exception as e:
+            self.error = str(e)
             self.logger.error(f"Error during backup: {str(e)}")
+            return None
         finally:
             # Clean up
-            if hasattr(self, 'driver'):
-                self.driver.quit()
+            self.close()
+
+
+def load_batch_config(sources):
+    """Collect the blogs and settings of a batch run
+    
+    Each source is a blog URL, a text file with one blog URL per line (#
+    starts a comment) or a JSON file with "blogs" (URLs or objects with a
+    "url" and TeletypeBackup options), and optionally "defaults",
+    "rate_limits" (seconds per domain), "blog_workers" and "max_fetches".
+    """
+    config = {'blogs': [], 'defaults': {}, 'rate_limits': {}}
+    for source in sources:
+        if urlparse(source).scheme in ('http', 'https'):
+            config['blogs'].append(source)
+            continue
+        with open(source, 'r', encoding='utf-8') as f:
+            text = f.read()
+        if source.endswith('.json') or text.lstrip().startswith('{'):
+            loaded = json.loads(text)
+            config['blogs'].extend(loaded.get('blogs', []))
+            config['defaults'].update(loaded.get('defaults', {}))
+            config['rate_limits'].update(loaded.get('rate_limits', {}))
+            for key in ('blog_workers', 'max_fetches'):
+                if key in loaded:
+                    config[key] = loaded[key]
+        else:
+            for line in text.splitlines():
+                line = line.split('#', 1)[0].strip()
+                if line:
+                    config['blogs'].append(line)
+    return config
+
+
+class BatchBackup:
+    """Back up many blogs in one run
+    
+    blog_workers blogs are backed up at once. All of them share one
+    per-host rate limiter, with rate_limits overriding delay for particular
+    domains, and one semaphore that caps concurrent page fetches across
+    every blog at max_fetches. Each blog gets its own directory, log and
+    summary under output_dir, and batch_summary.json aggregates them.
+    """
+
+    def __init__(self, blogs, output_dir=None, blog_workers=2, max_fetches=0, delay=1.0,
+                 rate_limits=None, defaults=None):
+        self.blogs = []
+        seen = set()
+        for blog in blogs:
+            blog = {'url': blog} if isinstance(blog, str) else dict(blog)
+            blog['url'] = blog['url'].rstrip('/')
+            # Two backups of the same blog would share a directory and a log
+            if blog['url'] not in seen:
+                seen.add(blog['url'])
+                self.blogs.append(blog)
+        self.defaults = dict(defaults or {})
+        self.output_dir = output_dir or (
+            "teletype_batch" if self.defaults.get('incremental')
+            else f"teletype_batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.blog_workers = max(1, blog_workers)
+        self.max_fetches = max(0, max_fetches)
+        self.rate_limiter = HostRateLimiter(delay, rate_limits)
+        self.fetch_slots = threading.BoundedSemaphore(self.max_fetches) if self.max_fetches else None
+        
+        logging.basicConfig(level=logging.INFO, format=BATCH_LOG_FORMAT, handlers=[logging.StreamHandler()])
+        self.logger = logging.getLogger("TeletypeBackup.batch")
+        self.logger.setLevel(logging.INFO)
+    
+    def _blog_dir(self, blog):
+        return blog.get('output_dir') or os.path.join(self.output_dir, blog_name(blog['url']))
+    
+    def backup_blog(self, blog):
+        """Back up one blog and return its line of the aggregate report"""
+        options = {**self.defaults, **{key: value for key, value in blog.items() if key != 'url'}}
+        options['output_dir'] = self._blog_dir(blog)
+        started = time.monotonic()
+        result = {"url": blog['url'], "output_dir": options['output_dir']}
+        try:
+            backup = TeletypeBackup(blog['url'], rate_limiter=self.rate_limiter,
+                                    fetch_slots=self.fetch_slots, **options)
+            summary = backup.backup_with_sections()
+            error = backup.error
+        except Exception as e:
+            summary, error = None, str(e)
+        result["elapsed"] = round(time.monotonic() - started, 3)
+        if summary is None:
+            self.logger.error(f"Backup of {blog['url']} failed: {error}")
+            result.update({"status": "failed", "error": error})
+            return result
+        result.update({
+            "status": "ok" if not summary['failed_downloads'] else "partial",
+            "title": summary['title'],
+            "total_posts": summary['total_posts'],
+            "successful_downloads": summary['successful_downloads'],
+            "failed_downloads": summary['failed_downloads'],
+            "skipped_posts": summary['skipped_posts'],
+            "bytes_written": summary['metrics']['counters'].get('bytes.written', 0)
+        })
+        self.logger.info(f"Backed up {blog['url']}: {summary['successful_downloads']}/{summary['total_posts']} posts")
+        return result
+    
+    def run(self):
+        """Back up every blog and write batch_summary.json, returning the aggregate report"""
+        started = time.monotonic()
+        self.logger.info(f"Backing up {len(self.blogs)} blogs, {self.blog_workers} at a time"
+                         + (f", at most {self.max_fetches} page fetches at once" if self.max_fetches else ""))
+        results = [None] * len(self.blogs)
+        with ThreadPoolExecutor(max_workers=self.blog_workers, thread_name_prefix="blog-worker") as executor:
+            futures = {executor.submit(self.backup_blog, blog): i for i, blog in enumerate(self.blogs)}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        
+        report = {
+            "blogs": len(results),
+            "succeeded": sum(1 for result in results if result['status'] == 'ok'),
+            "partial": sum(1 for result in results if result['status'] == 'partial'),
+            "failed": sum(1 for result in results if result['status'] == 'failed'),
+            "total_posts": sum(result.get('total_posts', 0) for result in results),
+            "successful_downloads": sum(result.get('successful_downloads', 0) for result in results),
+            "failed_downloads": sum(result.get('failed_downloads', 0) for result in results),
+            "bytes_written": sum(result.get('bytes_written', 0) for result in results),
+            "blog_workers": self.blog_workers,
+            "max_fetches": self.max_fetches,
+            "backup_date": datetime.now().isoformat(),
+            "elapsed": round(time.monotonic() - started, 3),
+            "results": results
+        }
+        with open(os.path.join(self.output_dir, "batch_summary.json"), 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        self.logger.info(f"Batch complete: {report['succeeded']} ok, {report['partial']} partial, "
+                         f"{report['failed']} failed of {report['blogs']} blogs")
+        return report
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teletype Blog Backup Tool")
+    parser.add_argument('--url', help="The URL of the Teletype blog to backup")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of posts to download concurrently, each with its own browser (default: 1)")
+    parser.add_argument('--delay', type=float, default=1.0,
+                        help="Minimum delay between page requests to the same host in seconds (default: 1)")
+    parser.add_argument('--fetch-mode', choices=FETCH_MODES, default='auto',
+                        help="auto: plain HTTP with browser fallback, browser: always use Firefox, "
+                             "http: never start Firefox (default: auto)")
+    parser.add_argument('--output', help="Directory to save the backup (default: automatically generated)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Resume into a stable output directory, skipping posts a previous run already saved")
+    parser.add_argument('--recheck', action='store_true',
+                        help="With --incremental, re-fetch saved posts and rewrite only those whose content changed")
+    parser.add_argument('--engine', choices=ENGINES, default='threads',
+                        help="threads: download posts on worker threads spaced by --delay, async: download them "
+                             "with asyncio, adapting concurrency to the server's responses (needs aiohttp, "
+                             "default: threads)")
+    parser.add_argument('--max-concurrency', type=int, default=16,
+                        help="With --engine async, the most post requests in flight at once (default: 16)")
+    parser.add_argument('--optimize-images', choices=IMAGE_FORMATS,
+                        help="Re-encode downloaded images in this format, with narrower copies for srcset "
+                             "(needs Pillow)")
+    parser.add_argument('--image-quality', type=int, default=80,
+                        help="Encoder quality of optimized images (default: 80)")
+    parser.add_argument('--image-widths', type=int, nargs='+', default=list(IMAGE_WIDTHS),
+                        help="Widths of the narrower copies of optimized images "
+                             f"(default: {' '.join(map(str, IMAGE_WIDTHS))})")
+    parser.add_argument('--originals', choices=ORIGINAL_POLICIES, default='keep',
+                        help="Keep or delete original images once a smaller optimized copy exists (default: keep)")
+    parser.add_argument('--image-workers', type=int,
+                        help="Number of processes that optimize images (default: one per CPU)")
+    parser.add_argument('--no-search-index', action='store_true',
+                        help=f"Do not build the {SEARCH_INDEX_NAME} full-text index used by the search command")
+    parser.add_argument('--detect-changes', action='store_true',
+                        help="With --incremental, fetch saved posts again only when their listing card or a "
+                             "conditional HEAD request shows they changed")
+    parser.add_argument('--asset-workers', type=int, default=8,
+                        help="Number of images to download concurrently (default: 8)")
+    parser.add_argument('--revalidate-assets', action='store_true',
+                        help="Check already stored images with conditional requests instead of reusing them as is")
+    parser.add_argument('--section-workers', type=int, default=1,
+                        help="Number of sections to crawl concurrently, each with its own browser (default: 1)")
+    parser.add_argument('--browser-memory-cap', type=int, default=0,
+                        help="Limit concurrent section crawlers to this many MB of browser memory (default: no limit)")
+    parser.add_argument('--discovery', choices=DISCOVERY_MODES, default='auto',
+                        help="auto: enumerate posts from feeds and scroll only if they are incomplete, "
+                             "feed: feeds only, scroll: scroll only (default: auto)")
+    parser.add_argument('--feed-api',
+                        help="Paginated JSON listing URL with {page}, {offset}, {limit}, {username} "
+                             "or {domain} placeholders, tried before the sitemap and RSS feeds")
+    parser.add_argument('--feed-workers', type=int, default=4,
+                        help="Number of feed pages to fetch concurrently (default: 4)")
+    parser.add_argument('--record', metavar='DIR',
+                        help="Save every HTTP response to DIR for replay with fixture_server.py")
+    parser.add_argument('--metrics-format', choices=METRICS_FORMATS,
+                        help="Also export per-phase timings and counters as metrics.jsonl or metrics.prom")
+    parser.add_argument('--process-workers', type=int, default=0,
+                        help="Number of processes that parse and write fetched posts while the fetchers "
+                             "load the next pages (default: 0, process posts on the fetching thread)")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='directory',
+                        help=f"directory: one directory per post, archive: posts and images compressed into "
+                             f"{ARCHIVE_NAME}, see the extract command (default: directory)")
+    parser.add_argument('--wait-timeout', type=float, default=10.0,
+                        help="Maximum seconds to wait for a page or a scroll to finish loading (default: 10)")
+    parser.add_argument('--recycle-browser-pages', type=int, default=0,
+                        help="Restart each browser after it has loaded this many pages (default: never)")
+    parser.add_argument('--recycle-browser-rss', type=int, default=0,
+                        help="Restart a browser before its next page once it uses more than this many MB "
+                             "(needs psutil, default: never)")
+    parser.add_argument('--max-dom-cards', type=int, default=0,
+                        help="While scrolling, remove already read post cards from the page once more than "
+                             "this many were read (default: keep every card)")
+    parser.add_argument('--spool-urls', action='store_true',
+                        help="Keep discovered post URLs in a scratch SQLite file instead of memory")
+    parser.add_argument('--low-memory', action='store_true',
+                        help="Memory-bounded crawl for very large blogs: defaults the four options above to "
+                             "200 pages, 1500 MB, 200 cards and spooling")
+    commands = parser.add_subparsers(dest='command')
+    extract = commands.add_parser('extract', help="Recreate the directory layout of an archive backup")
+    extract.add_argument('archive', help=f"{ARCHIVE_NAME} of a backup made with --format archive")
+    extract.add_argument('--output', dest='extract_output', default='.',
+                         help="Directory to extract into (default: current directory)")
+    extract.add_argument('--post', metavar='SLUG', help="Only extract this post and its images")
+    search = commands.add_parser('search', help="Search the posts of a backup by title, date, author and text")
+    search.add_argument('backup', help=f"Backup directory holding {SEARCH_INDEX_NAME}")
+    search.add_argument('query', nargs='+', help="Words to find, or an SQLite FTS5 query such as "
+                                                  "'title:python AND date:2024'")
+    search.add_argument('--limit', type=int, default=20, help="Maximum number of results (default: 20)")
+    batch = commands.add_parser('batch', help="Back up many blogs, each into its own directory, with shared "
+                                              "rate limits; the options above apply to every blog")
+    batch.add_argument('sources', nargs='+',
+                       help="Blog URLs, text files with one blog URL per line, or JSON batch configs")
+    batch.add_argument('--output', dest='batch_output',
+                       help="Directory holding one subdirectory per blog and batch_summary.json "
+                            "(default: automatically generated)")
+    batch.add_argument('--blog-workers', type=int,
+                       help="Number of blogs to back up at once (default: 2)")
+    batch.add_argument('--max-fetches', type=int,
+                       help="Maximum page fetches in flight across all blogs (default: no limit)")
+    args = parser.parse_args()
+    
+    if args.command == 'extract':
+        count = extract_archive(args.archive, args.extract_output, args.post)
+        print(f"Extracted {count} files to {args.extract_output}")
+        raise SystemExit(0)
+    
+    if args.command == 'search':
+        index_path = os.path.join(args.backup, SEARCH_INDEX_NAME)
+        if not os.path.exists(index_path):
+            raise SystemExit(f"No {SEARCH_INDEX_NAME} in {args.backup}")
+        index = SearchIndex(index_path)
+        started = time.monotonic()
+        results = index.search(" ".join(args.query), args.limit)
+        elapsed_ms = (time.monotonic() - started) * 1000
+        for result in results:
+            print(f"{result['date'] or '-'}  {result['title'] or result['slug']}  {result['url']}")
+            if result['snippet']:
+                print(f"    {result['snippet']}")
+        print(f"{len(results)} results of {len(index)} posts in {elapsed_ms:.1f} ms")
+        index.close()
+        raise SystemExit(0)
+    
+    memory_options = {
+        'recycle_pages': args.recycle_browser_pages,
+        'recycle_rss_mb': args.recycle_browser_rss,
+        'max_dom_cards': args.max_dom_cards,
+        'spool_urls': args.spool_urls
+    }
+    if args.low_memory:
+        memory_options = {key: value or LOW_MEMORY_DEFAULTS[key] for key, value in memory_options.items()}
+    options = dict(workers=args.workers, fetch_mode=args.fetch_mode,
+                   wait_timeout=args.wait_timeout, incremental=args.incremental, recheck=args.recheck,
+                   detect_changes=args.detect_changes, search_index=not args.no_search_index,
+                   optimize_images=args.optimize_images, image_quality=args.image_quality,
+                   image_widths=args.image_widths, originals=args.originals, image_workers=args.image_workers,
+                   engine=args.engine, max_concurrency=args.max_concurrency,
+                   asset_workers=args.asset_workers, revalidate_assets=args.revalidate_assets,
+                   section_workers=args.section_workers, browser_memory_cap=args.browser_memory_cap,
+                   discovery=args.discovery, feed_api=args.feed_api, feed_workers=args.feed_workers,
+                   record_dir=args.record, metrics_format=args.metrics_format,
+                   process_workers=args.process_workers, output_format=args.format,
+                   **memory_options)
+    
+    if args.command == 'batch':
+        config = load_batch_config(args.sources)
+        blog_workers = args.blog_workers or config.get('blog_workers', 2)
+        max_fetches = args.max_fetches if args.max_fetches is not None else config.get('max_fetches', 0)
+        report = BatchBackup(config['blogs'], output_dir=args.batch_output, blog_workers=blog_workers,
+                             max_fetches=max_fetches, delay=args.delay, rate_limits=config['rate_limits'],
+                             defaults={**options, **config['defaults']}).run()
+        print(f"Backed up {report['succeeded'] + report['partial']}/{report['blogs']} blogs, "
+              f"{report['successful_downloads']}/{report['total_posts']} posts")
+        raise SystemExit(1 if report['failed'] else 0)
+    
     print("Teletype Blog Backup Tool")
     print("------------------------")
-    blog_url = input("Enter your blog URL (e.g., https://titanida.com): ")
+    blog_url = args.url or input("Enter your blog URL (e.g., https://titanida.com): ")
     
     start_time = time.time()
-    backup = TeletypeBackup(blog_url)
+    backup = TeletypeBackup(blog_url, delay=args.delay, output_dir=args.output, **options)
     
     # Choose the more complete backup method that checks each section
     backup.backup_with_sections()
@@ -0,0 +1,410 @@
+import asyncio
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('TQDM_DISABLE', '1')
+
+from fixture_server import SyntheticBlog, make_replay_server, make_synthetic_server, start_in_background
+import teletype
+from selenium.common.exceptions import NoSuchElementException
+from teletype import (ARCHIVE_NAME, CARD_FIELDS, POST_READY_SELECTORS, POST_SELECTORS, BatchBackup, FetchContext,
+                      HostRateLimiter, Image, Metrics, TeletypeBackup, aiohttp, blog_name, extract_archive,
+                      iter_markdown, psutil)
+
+
+@pytest.fixture
+def serve():
+    """Start fixture servers on free ports and shut them down after the test"""
+    servers = []
+
+    def start(server):
+        servers.append(server)
+        return start_in_background(server)
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def backup(url, output_dir, **options):
+    options.setdefault('delay', 0)
+    options.setdefault('fetch_mode', 'http')
+    summary = TeletypeBackup(url, output_dir=str(output_dir), **options).backup_with_sections()
+    assert summary is not None
+    return summary
+
+
+def test_feed_discovery_from_sitemap(serve, tmp_path):
+    url = serve(make_synthetic_server(SyntheticBlog(posts=12, images_per_post=1)))
+    summary = backup(url, tmp_path, discovery='feed')
+    assert summary['discovery'] == 'feed'
+    assert summary['total_posts'] == 12
+    assert summary['successful_downloads'] == 12
+    post = json.loads((tmp_path / "posts" / "post-00003" / "post.json").read_text(encoding='utf-8'))
+    assert post['title'] == "Post 3"
+
+
+def test_feed_api_stops_on_clamped_pages(serve, tmp_path):
+    # The endpoint gives no total and repeats its last page for any page past the end
+    url = serve(make_synthetic_server(SyntheticBlog(posts=45, images_per_post=0)))
+    backup_ = TeletypeBackup(url, delay=0, fetch_mode='http', output_dir=str(tmp_path),
+                             feed_api=url + "/api/posts?page={page}")
+    try:
+        urls = backup_._api_post_urls(set())
+    finally:
+        backup_.close()
+    assert len(set(urls)) == 45
+
+
+def test_incremental_rerun_skips_saved_posts(serve, tmp_path):
+    blog = SyntheticBlog(posts=6, images_per_post=1)
+    url = serve(make_synthetic_server(blog))
+    first = backup(url, tmp_path, incremental=True, discovery='feed')
+    assert first['successful_downloads'] == 6
+
+    blog.posts = 8
+    second = backup(url, tmp_path, incremental=True, discovery='feed')
+    assert second['total_posts'] == 8
+    assert second['skipped_posts'] == 6
+    assert second['successful_downloads'] == 2
+
+
+def test_change_detection_refetches_only_changed_posts(serve, tmp_path):
+    blog = SyntheticBlog(posts=6, images_per_post=0)
+    url = serve(make_synthetic_server(blog))
+    backup(url, tmp_path, incremental=True)
+
+    unchanged = backup(url, tmp_path, incremental=True, detect_changes=True)
+    assert unchanged['change_detection']['unchanged'] == 6
+    assert unchanged['successful_downloads'] == 0
+
+    article = blog.article
+    blog.article = lambda post: article(post).replace("Paragraph 0", "Edited paragraph 0") \
+        if post == 2 else article(post)
+    changed = backup(url, tmp_path, incremental=True, detect_changes=True)
+    assert changed['change_detection']['http_changed'] == 1
+    assert changed['successful_downloads'] == 1
+    markdown = (tmp_path / "posts" / "post-00002" / "index.md").read_text(encoding='utf-8')
+    assert "Edited paragraph 0" in markdown
+
+
+def test_archive_round_trip_and_extract(serve, tmp_path):
+    url = serve(make_synthetic_server(SyntheticBlog(posts=4, images_per_post=2)))
+    summary = backup(url, tmp_path / "backup", output_format='archive', discovery='feed')
+    assert summary['successful_downloads'] == 4
+    archive = tmp_path / "backup" / ARCHIVE_NAME
+    assert not (tmp_path / "backup" / "posts").exists()
+
+    written = extract_archive(str(archive), str(tmp_path / "full"))
+    assert written > 0
+    assert len(list((tmp_path / "full" / "posts").iterdir())) == 4
+
+    extract_archive(str(archive), str(tmp_path / "single"), slug="post-00001")
+    assert [path.name for path in (tmp_path / "single" / "posts").iterdir()] == ["post-00001"]
+    markdown = (tmp_path / "single" / "posts" / "post-00001" / "index.md").read_text(encoding='utf-8')
+    assert (tmp_path / "full" / "posts" / "post-00001" / "index.md").read_text(encoding='utf-8') == markdown
+    # Every image the post links to came along
+    images = re.findall(r'!\[[^\]]*\]\(([^)\s]+)\)', markdown)
+    assert len(images) == 3
+    for image in images:
+        assert (tmp_path / "single" / "posts" / "post-00001" / image).resolve().is_file()
+
+
+def test_replay_of_a_recording(serve, tmp_path):
+    url = serve(make_synthetic_server(SyntheticBlog(posts=5, images_per_post=1)))
+    recorded = backup(url, tmp_path / "live", record_dir=str(tmp_path / "recording"), discovery='feed')
+
+    replay_url = serve(make_replay_server(str(tmp_path / "recording")))
+    replayed = backup(replay_url, tmp_path / "replayed", discovery='feed')
+    assert replayed['total_posts'] == recorded['total_posts'] == 5
+    assert replayed['successful_downloads'] == 5
+    assert (tmp_path / "replayed" / "posts" / "post-00004" / "index.md").read_text(encoding='utf-8') \
+        == (tmp_path / "live" / "posts" / "post-00004" / "index.md").read_text(encoding='utf-8').replace(url, replay_url)
+
+
+def test_metrics_percentiles_use_nearest_rank():
+    assert [Metrics._percentile(list(range(1, n + 1)), 0.5) for n in (1, 2, 5, 6, 10)] == [1, 1, 3, 3, 5]
+    assert Metrics._percentile(list(range(1, 21)), 0.95) == 19
+    assert Metrics._percentile(list(range(1, 101)), 0.95) == 95
+
+
+@pytest.mark.parametrize("html, markdown", [
+    ("<p>1. not a list</p>", "1\\. not a list\n"),
+    ("<p># not a heading</p><p>&gt; not a quote</p>", "\\# not a heading\n\n\\> not a quote\n"),
+    ("<p>- not an item</p><p>---</p><p>-5 degrees</p>", "\\- not an item\n\n\\---\n\n-5 degrees\n"),
+    ("<ul><li>2) first</li></ul>", "- 2\\) first\n"),
+    ("<p>run <code>a`b</code> or <code>`c`</code></p>", "run ``a`b`` or `` `c` ``\n"),
+    ("<p><code>a</code><code>b</code></p>", "`a` `b`\n"),
+    ("<p>x &lt;div&gt; &amp;amp; &amp;#38; &amp; y</p>", "x \\<div> \\&amp; \\&#38; & y\n"),
+])
+def test_markdown_escapes_block_markers_and_code(html, markdown):
+    assert "".join(iter_markdown(html)) == markdown
+
+
+def test_blogs_on_one_host_get_their_own_directory_and_log(tmp_path):
+    batch = BatchBackup([{'url': "https://teletype.in/@alice"}, {'url': "https://teletype.in/@bob"},
+                         {'url': "https://teletype.in"}], str(tmp_path))
+    directories = {batch._blog_dir(blog) for blog in batch.blogs}
+    assert len(directories) == 3
+    assert os.path.join(str(tmp_path), "teletype.in__alice") in directories
+    assert blog_name("http://127.0.0.1:8000/") == "127.0.0.1_8000"
+
+
+@pytest.mark.skipif(Image is None, reason="needs Pillow")
+def test_dropped_originals_stay_while_older_posts_link_to_them(serve, tmp_path):
+    blog = SyntheticBlog(posts=4, images_per_post=1, image_size=600)
+    url = serve(make_synthetic_server(blog))
+    backup(url, tmp_path, incremental=True, discovery='feed')
+
+    blog.posts = 5
+    summary = backup(url, tmp_path, incremental=True, discovery='feed', optimize_images='webp', originals='drop')
+    assert summary['successful_downloads'] == 1
+    # Only the new post's own image went; the shared cover is still linked from older posts
+    assert summary['image_optimization']['dropped_originals'] == 1
+    for markdown in (tmp_path / "posts").glob("*/index.md"):
+        for link in re.findall(r'\]\((\.\./\.\./assets/[^)]+)\)', markdown.read_text(encoding='utf-8')):
+            assert (markdown.parent / link).resolve().is_file()
+
+
+@pytest.mark.skipif(Image is None, reason="needs Pillow")
+def test_rendering_without_the_drop_settings_downloads_dropped_originals(serve, tmp_path):
+    url = serve(make_synthetic_server(SyntheticBlog(posts=3, images_per_post=1, image_size=600)))
+    summary = backup(url, tmp_path, discovery='feed', optimize_images='webp', originals='drop')
+    assert summary['image_optimization']['dropped_originals'] > 0
+
+    for options in ({}, {'optimize_images': 'webp', 'image_quality': 50}):
+        backup(url, tmp_path, discovery='feed', **options)
+        for markdown in (tmp_path / "posts").glob("*/index.md"):
+            for link in re.findall(r'\]\((\.\./\.\./assets/[^)]+)\)', markdown.read_text(encoding='utf-8')):
+                assert (markdown.parent / link).resolve().is_file()
+
+
+@pytest.mark.skipif(Image is None, reason="needs Pillow")
+def test_extracting_one_post_includes_its_srcset_variants(serve, tmp_path):
+    url = serve(make_synthetic_server(SyntheticBlog(posts=2, images_per_post=1, image_size=1200)))
+    backup(url, tmp_path / "backup", output_format='archive', discovery='feed', optimize_images='webp')
+    extract_archive(str(tmp_path / "backup" / ARCHIVE_NAME), str(tmp_path / "single"), slug="post-00000")
+    post_dir = tmp_path / "single" / "posts" / "post-00000"
+    content = json.loads((post_dir / "post.json").read_text(encoding='utf-8'))['content']
+    variants = re.findall(r'(\.\./\.\./assets/[^\s",]+\.w480\.webp)', content)
+    assert variants
+    for variant in variants:
+        assert (post_dir / variant).resolve().is_file()
+
+
+@pytest.mark.skipif(aiohttp is None, reason="needs aiohttp")
+def test_async_engine_limits_browser_fallbacks_to_workers(serve, tmp_path, monkeypatch):
+    # Without JavaScript the articles lack their content, so every post needs the browser
+    blog = SyntheticBlog(posts=12, images_per_post=0)
+    article = blog.article
+    blog.article = lambda post: article(post).replace("article__content", "article__body")
+    url = serve(make_synthetic_server(blog))
+    browser_threads = set()
+    lock = threading.Lock()
+
+    class ArticleDriver:
+        def get(self, page_url):
+            with lock:
+                browser_threads.add(threading.current_thread().name)
+            self.page_source = article(int(page_url.rsplit('-', 1)[1]))
+
+        def find_element(self, by, selector):
+            return object()
+
+        def quit(self):
+            pass
+
+    monkeypatch.setattr(TeletypeBackup, '_worker_context',
+                        lambda self: FetchContext(HostRateLimiter(0), driver_factory=ArticleDriver))
+    summary = backup(url, tmp_path, fetch_mode='auto', discovery='feed', engine='async', workers=2)
+    assert summary['successful_downloads'] == 12
+    assert summary['pages_via_async'] == 0
+    assert len(browser_threads) <= 2
+    assert summary['rate_control']['requests'] == 12
+
+
+@pytest.mark.skipif(aiohttp is None, reason="needs aiohttp")
+def test_async_engine_keeps_a_host_interval_from_rate_limits(serve, tmp_path):
+    url = serve(make_synthetic_server(SyntheticBlog(posts=6, images_per_post=0)))
+    slots = []
+
+    class RecordingLimiter(HostRateLimiter):
+        def reserve(self, page_url):
+            delay = super().reserve(page_url)
+            if "/post-" in page_url:
+                slots.append(time.monotonic() + delay)
+            return delay
+
+    limiter = RecordingLimiter(0, {url.split("//", 1)[1]: 0.05})
+    summary = backup(url, tmp_path, discovery='feed', engine='async', workers=4, rate_limiter=limiter)
+    assert summary['successful_downloads'] == 6
+    assert len(slots) == 6
+    assert all(later - earlier >= 0.049 for earlier, later in zip(slots, slots[1:]))
+
+
+@pytest.mark.skipif(aiohttp is None, reason="needs aiohttp")
+def test_cancelled_async_fetch_gives_back_its_fetch_slot(serve, tmp_path):
+    url = serve(make_synthetic_server(SyntheticBlog(posts=1, images_per_post=0)))
+    slots = threading.BoundedSemaphore(1)
+    backup_ = TeletypeBackup(url, delay=0, fetch_mode='http', output_dir=str(tmp_path), engine='async',
+                             fetch_slots=slots)
+
+    async def cancel_while_waiting():
+        fetch = asyncio.ensure_future(backup_._fetch_async(None, url + "/post-00000"))
+        await asyncio.sleep(0.1)
+        fetch.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await fetch
+        # The executor thread takes the slot once it is free, and hands it straight back
+        slots.release()
+        await asyncio.sleep(0.1)
+
+    try:
+        assert slots.acquire(timeout=1)
+        asyncio.run(cancel_while_waiting())
+        assert slots.acquire(timeout=1)
+        assert backup_.rate_controller.in_flight == 0
+    finally:
+        backup_.close()
+
+
+class ListingContext:
+    """Stands in for a browser FetchContext on a listing page with the given post links"""
+
+    def __init__(self, hrefs):
+        self.hrefs = hrefs
+        self.http_fetches = []
+        self.loaded = []
+
+    def fetch_http(self, url, selectors=()):
+        self.http_fetches.append(url)
+        return None
+
+    def get(self, url):
+        self.loaded.append(url)
+
+    def wait_for(self, url, selectors):
+        return True
+
+    def cards(self, start=0):
+        return [dict({'href': href}, **{name: None for name, _ in CARD_FIELDS}) for href in self.hrefs[start:]]
+
+    def prune_cards(self, seen, max_cards):
+        return seen
+
+    def scroll_for_more(self, url):
+        return False
+
+
+def test_auto_mode_loads_sections_without_a_known_count_only_in_the_browser(serve, tmp_path):
+    url = serve(make_synthetic_server(SyntheticBlog(posts=6, images_per_post=0)))
+    backup_ = TeletypeBackup(url, delay=0, fetch_mode='auto', output_dir=str(tmp_path))
+    try:
+        context = ListingContext(["/post-00001", "/post-00004"])
+        urls = backup_.check_section_posts(url + "/s/section-1", context)
+    finally:
+        backup_.close()
+    assert context.http_fetches == []
+    assert context.loaded == [url + "/s/section-1"]
+    assert list(urls) == [url + "/post-00001", url + "/post-00004"]
+
+
+class PostWithoutTitleDriver:
+    """A WebDriver whose rendered post has content but no .article__title"""
+
+    page_source = '<article><h1>Heading</h1><div class="article__content"><p>Text</p></div></article>'
+
+    def get(self, url):
+        pass
+
+    def find_element(self, by, selector):
+        if selector in POST_READY_SELECTORS:
+            return object()
+        raise NoSuchElementException(selector)
+
+    def quit(self):
+        pass
+
+
+def test_browser_posts_without_a_title_do_not_wait_out_the_timeout():
+    context = FetchContext(HostRateLimiter(0), mode='browser', driver_factory=PostWithoutTitleDriver,
+                           wait_timeout=3)
+    started = time.monotonic()
+    html = context.fetch_page("https://example.com/post", POST_SELECTORS, POST_READY_SELECTORS)
+    assert time.monotonic() - started < 1
+    assert "article__content" in html
+    assert context.wait_stats.summary()['timeouts'] == 0
+    context.close()
+
+
+@pytest.mark.skipif(psutil is None, reason="needs psutil")
+def test_section_crawlers_are_sized_from_a_measured_browser(serve, tmp_path, monkeypatch):
+    url = serve(make_synthetic_server(SyntheticBlog(posts=3, images_per_post=0)))
+    backup_ = TeletypeBackup(url, delay=0, fetch_mode='auto', output_dir=str(tmp_path), section_workers=4,
+                             browser_memory_cap=700)
+    lock = threading.Lock()
+    running = {'now': 0, 'most': 0}
+
+    def check_section_posts(section_url, context=None):
+        context.driver
+        with lock:
+            running['now'] += 1
+            running['most'] = max(running['most'], running['now'])
+        time.sleep(0.05)
+        with lock:
+            running['now'] -= 1
+        return [section_url + "/post"]
+
+    # A 300 MB browser fits two crawlers under the cap, where the 400 MB estimate fits one
+    monkeypatch.setattr(FetchContext, 'browser_rss_mb', lambda self: 300 if self._driver is not None else None)
+    monkeypatch.setattr(backup_, '_create_context', lambda: FetchContext(HostRateLimiter(0), driver_factory=object))
+    monkeypatch.setattr(backup_, 'check_section_posts', check_section_posts)
+    try:
+        sections = [{'name': f"Section {i}", 'url': f"{url}/s/section-{i}"} for i in range(7)]
+        results = backup_.crawl_sections(sections)
+    finally:
+        backup_.close()
+    assert results == [[section['url'] + "/post"] for section in sections]
+    assert running['most'] == 2
+
+
+def test_process_pool_parses_pages_that_fetchers_only_download(serve, tmp_path, monkeypatch):
+    # Odd posts need JavaScript for their content, so the pool's check sends them to the browser
+    blog = SyntheticBlog(posts=10, images_per_post=0)
+    article = blog.article
+    blog.article = lambda post: article(post).replace("article__content", "article__body") \
+        if post % 2 else article(post)
+    url = serve(make_synthetic_server(blog))
+    parse_threads = []
+    parse_html = teletype.parse_html
+
+    def spy(html):
+        parse_threads.append(threading.current_thread().name)
+        return parse_html(html)
+
+    class ArticleDriver:
+        def get(self, page_url):
+            self.page_source = article(int(page_url.rsplit('-', 1)[1]))
+
+        def find_element(self, by, selector):
+            return object()
+
+        def quit(self):
+            pass
+
+    spy.cache_info = parse_html.cache_info
+    monkeypatch.setattr(teletype, 'parse_html', spy)
+    monkeypatch.setattr(TeletypeBackup, 'setup_selenium', lambda self: ArticleDriver())
+    summary = backup(url, tmp_path, fetch_mode='auto', discovery='feed', process_workers=2, workers=2)
+    assert summary['successful_downloads'] == 10
+    assert summary['pages_via_browser'] == 5
+    assert summary['pages_via_http'] == 5 + 1  # the homepage
+    assert not [name for name in parse_threads if name.startswith("post-fetcher")]